@@ -0,0 +1,215 @@
+"""
+Approximate nearest-neighbour indexes over the L2-normalized embedding matrix.
+
+For catalogs with hundreds of thousands of courses a brute-force pass over every
+row becomes the latency floor. These indexes return an over-fetched candidate set
+(row ids + exact cosine similarities) that the recommender then filters, scores and
+diversifies as usual.
+
+- IVFIndex: pure NumPy inverted file. Rows are clustered with spherical k-means
+  into nlist lists; a query only scans its nprobe closest lists.
+- HNSWIndex: wraps hnswlib if it is installed (pip install hnswlib).
+
+Indexes are built by generate_embeddings.py and saved next to the binary store,
+together with each course's precomputed nearest neighbours (course_neighbors).
+"""
+
+import hashlib
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Rows scored per block during k-means assignment (bounds the block x nlist buffer)
+ASSIGN_BLOCK_SIZE = 8192
+# Courses scored per block when precomputing neighbour lists (bounds the block x catalog buffer)
+NEIGHBOR_BLOCK_SIZE = 256
+
+# One neighbour list entry: matrix row and its cosine similarity to the course
+NEIGHBOR_DTYPE = np.dtype([('row', '<i4'), ('score', '<f4')])
+
+
+def file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _top_n(sims: np.ndarray, rows: np.ndarray, top_n: int) -> Tuple[np.ndarray, np.ndarray]:
+    if rows.size > top_n:
+        keep = np.argpartition(-sims, top_n - 1)[:top_n]
+        rows, sims = rows[keep], sims[keep]
+    return rows, sims
+
+
+class IVFIndex:
+    kind = "ivf"
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_rows: np.ndarray, nprobe: int = 8):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @staticmethod
+    def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        assignments = np.empty(matrix.shape[0], dtype=np.int32)
+        for start in range(0, matrix.shape[0], ASSIGN_BLOCK_SIZE):
+            block = matrix[start:start + ASSIGN_BLOCK_SIZE]
+            assignments[start:start + ASSIGN_BLOCK_SIZE] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, nlist: Optional[int] = None, iterations: int = 10,
+              sample_size: int = 100_000, nprobe: int = 8, seed: int = 0) -> 'IVFIndex':
+        """Cluster the (normalized) rows with spherical k-means; nlist defaults to 4*sqrt(n)"""
+        rng = np.random.default_rng(seed)
+        n = matrix.shape[0]
+        nlist = max(1, min(n, nlist or int(4 * np.sqrt(n))))
+
+        # Train on a sample, then assign every row to its closest centroid
+        sample = matrix[np.sort(rng.choice(n, size=min(n, sample_size), replace=False))]
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = cls._assign(sample, centroids)
+            counts = np.bincount(assignments, minlength=nlist)
+            order = np.argsort(assignments, kind='stable')
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            filled = counts > 0
+            sums = np.zeros_like(centroids)
+            sums[filled] = np.add.reduceat(sample[order], starts[filled], axis=0)
+
+            # Empty lists restart from a random sample row
+            empty = np.flatnonzero(counts == 0)
+            sums[empty] = sample[rng.choice(sample.shape[0], size=empty.size)]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = (sums / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+        assignments = cls._assign(matrix, centroids)
+        list_rows = np.argsort(assignments, kind='stable').astype(np.int64)
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=nlist), out=list_offsets[1:])
+        return cls(centroids, list_offsets, list_rows, nprobe)
+
+    def search(self, matrix: np.ndarray, queries: np.ndarray, top_n: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """For each unit-length query: (rows, cosine similarities) of up to top_n candidates"""
+        nprobe = min(self.nprobe, self.nlist)
+        results = []
+        for query in queries:
+            # One query at a time: the probed lists (and so the results) don't depend on the other queries
+            probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+            rows = np.concatenate([
+                self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe
+            ])
+            results.append(_top_n(matrix[rows] @ query, rows, top_n))
+        return results
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            np.savez(f, centroids=self.centroids, list_offsets=self.list_offsets, list_rows=self.list_rows)
+
+    @classmethod
+    def load(cls, path: str, nprobe: int = 8) -> 'IVFIndex':
+        with np.load(path) as data:
+            return cls(data['centroids'], data['list_offsets'], data['list_rows'], nprobe)
+
+    def set_params(self, nprobe: Optional[int] = None, **_):
+        if nprobe:
+            self.nprobe = nprobe
+
+
+class HNSWIndex:
+    kind = "hnsw"
+
+    def __init__(self, index, ef: int = 64):
+        self.index = index
+        self.ef = ef
+        self.index.set_ef(ef)
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, m: int = 16, ef_construction: int = 200, ef: int = 64,
+              seed: int = 0) -> 'HNSWIndex':
+        import hnswlib
+        index = hnswlib.Index(space='ip', dim=matrix.shape[1])
+        index.init_index(max_elements=matrix.shape[0], M=m, ef_construction=ef_construction, random_seed=seed)
+        index.add_items(np.asarray(matrix), np.arange(matrix.shape[0]))
+        return cls(index, ef)
+
+    def search(self, matrix: np.ndarray, queries: np.ndarray, top_n: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        top_n = min(top_n, self.index.get_current_count())
+        # hnswlib needs ef >= k to return k results
+        self.index.set_ef(max(self.ef, top_n))
+        labels, distances = self.index.knn_query(queries, k=top_n)
+        # 'ip' distance is 1 - inner product
+        return [(rows.astype(np.int64), (1.0 - dists).astype(np.float32)) for rows, dists in zip(labels, distances)]
+
+    def save(self, path: str):
+        self.index.save_index(path)
+
+    @classmethod
+    def load(cls, path: str, dim: int, count: int, ef: int = 64) -> 'HNSWIndex':
+        import hnswlib
+        index = hnswlib.Index(space='ip', dim=dim)
+        index.load_index(path, max_elements=count)
+        return cls(index, ef)
+
+    def set_params(self, ef: Optional[int] = None, **_):
+        if ef:
+            self.ef = ef
+
+
+def index_path(matrix_path: str, kind: str) -> str:
+    """Path of the index file for a matrix file (foo.npy -> foo.ivf.npz / foo.hnsw.bin)"""
+    suffix = '.ivf.npz' if kind == 'ivf' else '.hnsw.bin'
+    return os.path.splitext(matrix_path)[0] + suffix
+
+
+def neighbors_path(matrix_path: str) -> str:
+    """Path of the neighbour lists for a matrix file (foo.npy -> foo.neighbors.npy)"""
+    return os.path.splitext(matrix_path)[0] + '.neighbors.npy'
+
+
+def course_neighbors(matrix: np.ndarray, m: int) -> np.ndarray:
+    """
+    Exact top-m neighbours of every row (itself excluded) as an (n, m) NEIGHBOR_DTYPE
+    array, most similar first (ties in row order). m is capped at n - 1.
+    """
+    n = matrix.shape[0]
+    m = max(0, min(m, n - 1))
+    neighbors = np.empty((n, m), dtype=NEIGHBOR_DTYPE)
+    if m == 0:
+        return neighbors
+
+    for start in range(0, n, NEIGHBOR_BLOCK_SIZE):
+        sims = matrix[start:start + NEIGHBOR_BLOCK_SIZE] @ matrix.T
+        block = np.arange(sims.shape[0])
+        sims[block, start + block] = -np.inf
+        top = np.argpartition(-sims, m - 1, axis=1)[:, :m]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.lexsort((top, -top_sims), axis=1)
+        neighbors['row'][start:start + sims.shape[0]] = np.take_along_axis(top, order, axis=1)
+        neighbors['score'][start:start + sims.shape[0]] = np.take_along_axis(top_sims, order, axis=1)
+    return neighbors
+
+
+def build_index(matrix: np.ndarray, kind: str = 'ivf', **params):
+    if kind == 'ivf':
+        return IVFIndex.build(matrix, **params)
+    if kind == 'hnsw':
+        return HNSWIndex.build(matrix, **params)
+    raise ValueError(f"Unknown ANN index kind: {kind}")
+
+
+def load_index(path: str, kind: str, dim: int, count: int):
+    if kind == 'ivf':
+        return IVFIndex.load(path)
+    if kind == 'hnsw':
+        return HNSWIndex.load(path, dim, count)
+    raise ValueError(f"Unknown ANN index kind: {kind}")
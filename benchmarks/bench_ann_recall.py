@@ -0,0 +1,119 @@
+"""
+ANN recall check on a synthetic clustered catalog. Exits non-zero when the
+overlap of the final recommendations with exact search falls below
+--min-overlap, or the index's own recall@5 (its top 5 neighbours of each
+student profile against the exact top 5) falls below --min-recall, so it can
+gate index, parameter or candidate changes.
+
+Neighbour recall alone says little about the results: the diversity pass takes
+the best course of each department, and for departments far from the profile
+that choice is decided by quality over near-noise similarities, which is what
+the quality leaders added to the ANN candidates cover. The default threshold
+leaves room for the leaders missing a far department's pick now and then
+(about 1% of results on 100k courses).
+
+    python -m benchmarks.bench_ann_recall [--courses 20000] [--subjects 60] [--profiles 200] [--index ivf]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_course_data
+from embedding_store import write_embedding_store
+from reccomender import CourseRecommender
+
+
+def _quiet():
+    return contextlib.redirect_stdout(open(os.devnull, "w"))
+
+
+def run(courses: int = 20000, profiles: int = 200, index: str = "ivf", k: int = 5,
+        overfetch: int = 20, ann_params: dict = None, seed: int = 0, subjects: int = 60) -> dict:
+    data = synthetic_course_data(courses, seed=seed, json_ready=False, subjects=subjects)
+    # Students take related courses: each transcript comes from one or two topics
+    rng = random.Random(seed)
+    by_topic = {}
+    for code, course in data.items():
+        by_topic.setdefault(course["course_description"].rsplit(" ", 1)[-1], []).append(code)
+    topics = list(by_topic)
+    transcripts = []
+    for _ in range(profiles):
+        pool = [code for topic in rng.sample(topics, rng.randint(1, 2)) for code in by_topic[topic]]
+        transcripts.append(rng.sample(pool, min(len(pool), rng.randint(1, 8))))
+
+    with tempfile.TemporaryDirectory() as tmp, _quiet():
+        store = os.path.join(tmp, "catalog.npy")
+        start = time.perf_counter()
+        write_embedding_store(data, store, ann_index=index)
+        build_seconds = time.perf_counter() - start
+
+        exact = CourseRecommender(store, cache_size=0, ann_exact_threshold=courses + 1)
+        approx = CourseRecommender(store, cache_size=0, ann_exact_threshold=0,
+                                   ann_overfetch=overfetch, ann_params=ann_params)
+
+        timings = {}
+        results = {}
+        for name, engine in (("exact", exact), ("ann", approx)):
+            start = time.perf_counter()
+            results[name] = [engine.recommend(t, k) for t in transcripts]
+            timings[name] = (time.perf_counter() - start) / profiles
+
+        # Neighbour recall of the index itself
+        vectors = approx._profiles([[approx.code_index[code] for code in t] for t in transcripts])
+        exact_neighbours = np.argpartition(-(vectors @ approx.embedding_matrix.T), k - 1, axis=1)[:, :k]
+        neighbour_hits = 0
+        for (rows, sims), expected_rows in zip(approx.ann_index.search(approx.embedding_matrix, vectors, k),
+                                               exact_neighbours):
+            neighbour_hits += len(set(rows.tolist()) & set(expected_rows.tolist()))
+
+    hits = sum(
+        len({r.course_code for r in a} & {r.course_code for r in e})
+        for a, e in zip(results["ann"], results["exact"])
+    )
+    expected = sum(len(e) for e in results["exact"])
+    return {
+        "courses": courses,
+        "profiles": profiles,
+        "subjects": subjects,
+        "index": index,
+        "ann_params": ann_params or {},
+        "overfetch": overfetch,
+        "index_build_seconds": build_seconds,
+        f"recall_at_{k}": neighbour_hits / (k * profiles),
+        f"recommendation_overlap_at_{k}": hits / expected if expected else 1.0,
+        "exact_ms_per_request": timings["exact"] * 1000,
+        "ann_ms_per_request": timings["ann"] * 1000
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=20000)
+    parser.add_argument("--profiles", type=int, default=200)
+    parser.add_argument("--subjects", type=int, default=60)
+    parser.add_argument("--index", choices=["ivf", "hnsw"], default="ivf")
+    parser.add_argument("--overfetch", type=int, default=20)
+    parser.add_argument("--nprobe", type=int, help="IVF lists probed per query")
+    parser.add_argument("--ef", type=int, help="HNSW search breadth")
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    parser.add_argument("--min-overlap", type=float, default=0.97)
+    args = parser.parse_args()
+
+    params = {key: value for key, value in (("nprobe", args.nprobe), ("ef", args.ef)) if value}
+    result = run(args.courses, args.profiles, args.index, overfetch=args.overfetch, ann_params=params,
+                 subjects=args.subjects)
+    print(json.dumps(result, indent=2))
+
+    recall, overlap = result["recall_at_5"], result["recommendation_overlap_at_5"]
+    if recall < args.min_recall or overlap < args.min_overlap:
+        print(f"❌ recall@5 {recall:.3f} (min {args.min_recall}), overlap@5 {overlap:.3f} (min {args.min_overlap})")
+        sys.exit(1)
+    print(f"✅ recall@5 {recall:.3f} >= {args.min_recall}, overlap@5 {overlap:.3f} >= {args.min_overlap}")
@@ -0,0 +1,101 @@
+"""
+Consistency check of the precomputed neighbour-list path against the full scan,
+for the one- and two-course profiles it serves. Exits non-zero when the overlap
+of the final recommendations falls below --min-overlap, so neighbour list size
+or candidate changes can be gated.
+
+Similarities on the neighbour path are exact, so a course recommended by both
+paths has the same score; differences only come from courses that never became
+candidates (neither a close neighbour nor a quality leader).
+
+The catalog has --subjects subject codes (the real one has about 60); the number of
+departments changes which courses the diversity pass picks, so keep it realistic.
+
+    python -m benchmarks.bench_neighbors [--courses 20000] [--subjects 60] [--profiles 500] [--neighbors 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_ann_recall import _quiet
+from benchmarks.synthetic import synthetic_course_data
+from embedding_store import write_embedding_store
+from reccomender import CourseRecommender
+
+
+def run(courses: int = 20000, profiles: int = 500, neighbors: int = 50, k: int = 5, seed: int = 0,
+        subjects: int = 60) -> dict:
+    data = synthetic_course_data(courses, seed=seed, json_ready=False, subjects=subjects)
+    rng = random.Random(seed)
+    codes = list(data)
+    transcripts = [rng.sample(codes, 1 + i % 2) for i in range(profiles)]
+
+    with tempfile.TemporaryDirectory() as tmp, _quiet():
+        store = os.path.join(tmp, "catalog.npy")
+        start = time.perf_counter()
+        write_embedding_store(data, store, neighbors=neighbors)
+        build_seconds = time.perf_counter() - start
+
+        exact = CourseRecommender(store, cache_size=0, neighbor_max_profile=0)
+        fast = CourseRecommender(store, cache_size=0)
+        candidates = [fast._neighbor_candidates(fast.embedding_matrix[0], [fast.code_index[c] for c in t])[0].size
+                      for t in transcripts] if fast.neighbors is not None else []
+
+        timings = {}
+        results = {}
+        for name, engine in (("exact", exact), ("neighbors", fast)):
+            engine.recommend(transcripts[0], k)  # warm-up
+            start = time.perf_counter()
+            results[name] = [engine.recommend(t, k) for t in transcripts]
+            timings[name] = (time.perf_counter() - start) / profiles
+
+    hits = 0
+    identical = 0
+    max_score_error = 0.0
+    for fast_recs, exact_recs in zip(results["neighbors"], results["exact"]):
+        exact_scores = {r.course_code: r.score for r in exact_recs}
+        shared = [r for r in fast_recs if r.course_code in exact_scores]
+        hits += len(shared)
+        identical += [r.course_code for r in fast_recs] == [r.course_code for r in exact_recs]
+        for r in shared:
+            max_score_error = max(max_score_error, abs(r.score - exact_scores[r.course_code]))
+
+    expected = sum(len(e) for e in results["exact"])
+    return {
+        "courses": courses,
+        "profiles": profiles,
+        "subjects": subjects,
+        "neighbors": neighbors,
+        "neighbor_path": fast.neighbors is not None,
+        "mean_candidates": sum(candidates) / len(candidates) if candidates else None,
+        "build_seconds": build_seconds,
+        f"recommendation_overlap_at_{k}": hits / expected if expected else 1.0,
+        "identical_rankings": identical / profiles,
+        "max_score_error": max_score_error,
+        "exact_ms_per_request": timings["exact"] * 1000,
+        "neighbors_ms_per_request": timings["neighbors"] * 1000
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=20000)
+    parser.add_argument("--subjects", type=int, default=60)
+    parser.add_argument("--profiles", type=int, default=500)
+    parser.add_argument("--neighbors", type=int, default=50)
+    parser.add_argument("--min-overlap", type=float, default=0.9)
+    args = parser.parse_args()
+
+    result = run(args.courses, args.profiles, args.neighbors, subjects=args.subjects)
+    print(json.dumps(result, indent=2))
+
+    overlap = result["recommendation_overlap_at_5"]
+    if overlap < args.min_overlap or result["max_score_error"] > 1e-5:
+        print(f"❌ overlap@5 {overlap:.3f} (min {args.min_overlap}), max score error {result['max_score_error']:.2g}")
+        sys.exit(1)
+    print(f"✅ overlap@5 {overlap:.3f} >= {args.min_overlap}, scores match the full scan")
@@ -0,0 +1,103 @@
+"""
+Transcript parser benchmark: extract_courses_separate_lists vs parse_transcript_courses
+on synthetic 10-20 term transcripts.
+
+At the default log level both parsers spend most of their time in the regex
+engine and run at the same speed: the old and new min-max ranges overlap, and
+the median ratio moves with machine noise. The new parser's gains are alignment
+(the old one misaligns nearly every synthetic transcript) and not logging every
+line, which is what the DEBUG timing shows. Times are the median over --repeat
+runs, with the fastest and slowest run.
+
+    python -m benchmarks.bench_pdfparser [--transcripts 200] [--repeat 9]
+"""
+
+import argparse
+import contextlib
+import logging
+import statistics
+import tempfile
+import time
+
+from benchmarks.synthetic import synthetic_transcript_batch
+from pdfparser import extract_courses_separate_lists, logger, parse_transcript_courses
+
+
+def _run_times(fn, texts, repeat: int, debug_to_file: bool = False) -> list:
+    """
+    Wall time of each of repeat runs. By default debug logging is off (the service default);
+    with debug_to_file, the parser's DEBUG lines go to a line-buffered file like a container log.
+    """
+    times = []
+    with contextlib.ExitStack() as stack:
+        level = logger.level
+        if debug_to_file:
+            sink = stack.enter_context(tempfile.TemporaryFile("w", buffering=1))
+            handler = logging.StreamHandler(sink)
+            logger.addHandler(handler)
+            stack.callback(logger.removeHandler, handler)
+            logger.setLevel(logging.DEBUG)
+        else:
+            logger.setLevel(logging.INFO)
+        stack.callback(logger.setLevel, level)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for text in texts:
+                fn(text)
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def _summary(times: list) -> dict:
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "min_ms": min(times) * 1000,
+        "max_ms": max(times) * 1000
+    }
+
+
+def run(transcripts: int = 200, repeat: int = 9) -> dict:
+    texts = synthetic_transcript_batch(transcripts)
+
+    # Both parsers must find the same course numbers before timing means anything. The old
+    # parser skips 6-letter subjects (MATBUS), which shifts every later code/number pair
+    misaligned = 0
+    for text in texts:
+        codes, numbers = extract_courses_separate_lists(text)
+        records = parse_transcript_courses(text)
+        assert [r.number for r in records] == numbers
+        if [c + n for c, n in zip(codes, numbers)] != [r.code for r in records]:
+            misaligned += 1
+
+    result = {
+        "transcripts": transcripts,
+        "total_chars": sum(len(t) for t in texts),
+        "old_parser_misaligned_transcripts": misaligned
+    }
+    for log_mode, debug_to_file in (("info", False), ("debug_log_file", True)):
+        old = _run_times(extract_courses_separate_lists, texts, repeat, debug_to_file)
+        new = _run_times(parse_transcript_courses, texts, repeat, debug_to_file)
+        result[log_mode] = {
+            "extract_courses_separate_lists": _summary(old),
+            "parse_transcript_courses": _summary(new),
+            "median_ratio": statistics.median(old) / statistics.median(new)
+        }
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--transcripts", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=9)
+    args = parser.parse_args()
+
+    result = run(args.transcripts, args.repeat)
+    print(f"📚 {result['transcripts']} transcripts, {result['total_chars']} chars")
+    for log_mode, label in (("info", "LOG_LEVEL=INFO (default)"), ("debug_log_file", "LOG_LEVEL=DEBUG -> line-buffered log")):
+        timings = result[log_mode]
+        print(f"⏱️ {label}")
+        for name, icon in (("extract_courses_separate_lists", "🐢"), ("parse_transcript_courses", "⚡")):
+            t = timings[name]
+            print(f"  {icon} {name + ':':32s} median {t['median_ms']:.1f} ms (min {t['min_ms']:.1f}, max {t['max_ms']:.1f})")
+        print(f"  ⚖️ Old/new median ratio: {timings['median_ratio']:.2f}x")
+    print(f"⚠️ Transcripts the old parser misaligned: {result['old_parser_misaligned_transcripts']}")
@@ -0,0 +1,272 @@
+"""
+Benchmark suite for the recommender and upload paths. Emits one JSON document so
+runs can be diffed across commits:
+
+- cold start: CourseRecommender load time and RSS per catalog size and format
+  (each load runs in a fresh process)
+- recommend_courses_json p50/p99 latency against profile size (result cache off)
+- transcript parser throughput (extract_courses_separate_lists, parse_transcript_courses,
+  and PDF text extraction)
+- end-to-end req/s and latency for /recommend and /upload-pdf through TestClient
+
+    python -m benchmarks.bench_suite [--sizes 1000,10000,100000] [--output results.json]
+
+Synthetic PDFs need reportlab; without it the PDF parts are skipped.
+"""
+
+import argparse
+import datetime
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import numpy as np
+
+from benchmarks.synthetic import (
+    synthetic_course_data, synthetic_transcript_batch, synthetic_transcript_pdf
+)
+from embedding_store import write_embedding_store
+from pdfparser import extract_courses_separate_lists, extract_transcript_text, parse_transcript_courses
+
+PROFILE_SIZES = (1, 3, 5, 10, 20, 40)
+
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux /proc; falls back to the peak from getrusage)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _percentiles(samples: List[float]) -> dict:
+    ms = np.asarray(samples) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99)),
+            "mean_ms": float(ms.mean()), "samples": len(samples)}
+
+
+def _cold_start_child(path: str, queue):
+    from reccomender import CourseRecommender
+    before = _rss_mb()
+    start = time.perf_counter()
+    engine = CourseRecommender(path)
+    seconds = time.perf_counter() - start
+    queue.put({"load_seconds": seconds, "rss_mb": _rss_mb(), "rss_delta_mb": _rss_mb() - before,
+               "courses": len(engine.all_codes)})
+
+
+def cold_start(path: str) -> dict:
+    """Load a catalog in a fresh (spawned) process so imports and page cache don't leak between runs"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_cold_start_child, args=(path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _transcripts(codes: List[str], size: int, count: int, seed: int) -> List[List[str]]:
+    rng = random.Random(seed)
+    return [rng.sample(codes, min(size, len(codes))) for _ in range(count)]
+
+
+def recommend_latency(path: str, requests: int, seed: int = 0) -> dict:
+    from reccomender import CourseRecommender
+    engine = CourseRecommender(path, cache_size=0)
+    results = {}
+    for size in PROFILE_SIZES:
+        bodies = [json.dumps({"completed_courses": t})
+                  for t in _transcripts(engine.all_codes, size, requests, seed + size)]
+        engine.recommend_courses_json(bodies[0])  # warm-up
+        samples = []
+        for body in bodies:
+            start = time.perf_counter()
+            engine.recommend_courses_json(body)
+            samples.append(time.perf_counter() - start)
+        results[str(size)] = _percentiles(samples)
+    return results
+
+
+def _throughput(fn: Callable, items: list, repeat: int, total_bytes: int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return {"items_per_second": len(items) / best, "mb_per_second": total_bytes / best / 2**20}
+
+
+def parser_throughput(transcripts: int, pdfs: int, repeat: int) -> dict:
+    texts = synthetic_transcript_batch(transcripts)
+    text_bytes = sum(len(t.encode()) for t in texts)
+    results = {
+        "transcripts": transcripts,
+        "extract_courses_separate_lists": _throughput(extract_courses_separate_lists, texts, repeat, text_bytes),
+        "parse_transcript_courses": _throughput(parse_transcript_courses, texts, repeat, text_bytes)
+    }
+    try:
+        documents = [synthetic_transcript_pdf(10 + i % 11, seed=i) for i in range(pdfs)]
+    except ImportError as e:
+        results["pdf_extract"] = {"skipped": str(e)}
+        return results
+    results["pdf_extract"] = _throughput(
+        lambda document: extract_transcript_text(io.BytesIO(document)),
+        documents, 1, sum(len(d) for d in documents)
+    )
+    return results
+
+
+def _load_test(call: Callable[[int], int], requests: int, concurrency: int) -> dict:
+    """Issue requests through call(i) -> status code from concurrency threads"""
+    latencies = [0.0] * requests
+    statuses = [0] * requests
+
+    def one(i):
+        start = time.perf_counter()
+        statuses[i] = call(i)
+        latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests_per_second": requests / elapsed,
+        "errors": sum(1 for status in statuses if status != 200),
+        **_percentiles(latencies)
+    }
+
+
+def end_to_end(path: str, requests: int, uploads: int, concurrency: int, seed: int = 0) -> dict:
+    """/recommend and /upload-pdf through the real app (PDF parsing in its process pool)"""
+    os.environ["EMBEDDINGS_FILE"] = path
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    main = importlib.import_module("main")
+    from fastapi.testclient import TestClient
+
+    results = {"catalog": os.path.basename(path)}
+    with TestClient(main.app) as client:
+        bodies = [{"completed_courses": t}
+                  for t in _transcripts(main.catalog.engine.all_codes, 8, requests, seed)]
+        client.post("/recommend", json=bodies[0])
+        results["recommend"] = _load_test(
+            lambda i: client.post("/recommend", json=bodies[i]).status_code, requests, concurrency
+        )
+
+        try:
+            documents = [synthetic_transcript_pdf(10 + i % 11, seed=i) for i in range(uploads)]
+        except ImportError as e:
+            results["upload_pdf"] = {"skipped": str(e)}
+            return results
+
+        def upload(i):
+            files = {"file": (f"transcript{i}.pdf", documents[i], "application/pdf")}
+            return client.post("/upload-pdf", files=files).status_code
+
+        upload(0)  # starts the worker processes
+        results["upload_pdf"] = _load_test(upload, uploads, concurrency)
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(sizes: List[int], json_max_courses: int = 10000, latency_requests: int = 200,
+        transcripts: int = 200, pdfs: int = 20, e2e_courses: int = None, e2e_requests: int = 500,
+        e2e_uploads: int = 40, concurrency: int = 4, repeat: int = 3) -> dict:
+    result = {
+        "meta": {
+            "git_commit": _git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count()
+        },
+        "catalogs": []
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for size in sizes:
+            data = synthetic_course_data(size, json_ready=False)
+            store = os.path.join(tmp, f"catalog{size}.npy")
+            write_embedding_store(data, store)
+            paths[size] = store
+
+            entry = {"courses": size, "cold_start": {"npy": cold_start(store)}}
+            # JSON catalogs of 100k courses are ~1 GB of float text; only the small sizes get one
+            if size <= json_max_courses:
+                json_path = os.path.join(tmp, f"catalog{size}.json")
+                with open(json_path, "w") as f:
+                    json.dump({code: {**course, "embedding": course["embedding"].tolist()}
+                               for code, course in data.items()}, f)
+                entry["cold_start"]["json"] = cold_start(json_path)
+            del data
+
+            entry["recommend_courses_json_latency"] = recommend_latency(store, latency_requests)
+            result["catalogs"].append(entry)
+            print(f"📊 {size} courses done", file=sys.stderr)
+
+        result["parser"] = parser_throughput(transcripts, pdfs, repeat)
+        print("📊 parser done", file=sys.stderr)
+
+        e2e_size = e2e_courses if e2e_courses in paths else sizes[0]
+        result["end_to_end"] = end_to_end(paths[e2e_size], e2e_requests, e2e_uploads, concurrency)
+        print("📊 end-to-end done", file=sys.stderr)
+
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated catalog sizes")
+    parser.add_argument("--json-max-courses", type=int, default=10000,
+                        help="Largest catalog also benchmarked in the JSON format")
+    parser.add_argument("--latency-requests", type=int, default=200, help="Requests per profile size")
+    parser.add_argument("--transcripts", type=int, default=200, help="Synthetic transcripts for parser throughput")
+    parser.add_argument("--pdfs", type=int, default=20, help="Synthetic PDFs for extraction throughput")
+    parser.add_argument("--e2e-courses", type=int, help="Catalog size for the end-to-end run (default: smallest)")
+    parser.add_argument("--e2e-requests", type=int, default=500)
+    parser.add_argument("--e2e-uploads", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    result = run(
+        [int(size) for size in args.sizes.split(",")],
+        json_max_courses=args.json_max_courses,
+        latency_requests=args.latency_requests,
+        transcripts=args.transcripts,
+        pdfs=args.pdfs,
+        e2e_courses=args.e2e_courses,
+        e2e_requests=args.e2e_requests,
+        e2e_uploads=args.e2e_uploads,
+        concurrency=args.concurrency
+    )
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
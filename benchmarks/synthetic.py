@@ -0,0 +1,106 @@
+"""
+Synthetic data for the benchmarks: transcript text laid out the way pdfminer
+extracts UWaterloo transcripts (a "Course" column of subjects, a "Course"
+column of numbers, then the "Grade" column, per term).
+"""
+
+import random
+from typing import List
+
+SUBJECTS = ["CS", "CO", "MATH", "STAT", "ECON", "PHYS", "AMATH", "PMATH", "ENGL", "PSYCH", "MATBUS", "ACTSC"]
+TERM_SEASONS = ["Fall", "Winter", "Spring"]
+
+
+def synthetic_transcript_text(terms: int, courses_per_term: int = 5, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    pages = []
+    for t in range(terms):
+        courses = [(rng.choice(SUBJECTS), str(rng.randint(100, 499)) + rng.choice(["", "", "", "A"]))
+                   for _ in range(courses_per_term)]
+        lines = [f"{TERM_SEASONS[t % 3]} {2018 + t // 3}  Level: {t // 2 + 1}{'AB'[t % 2]}", ""]
+        lines.append("Course")
+        lines += [subject for subject, _ in courses]
+        lines.append("Description")
+        lines += [f"Introduction to {subject} topic {number}" for subject, number in courses]
+        lines += ["", "Course"]
+        lines += [number for _, number in courses]
+        lines.append("Attempted Earned Grade")
+        lines += [f"0.50 0.50 {rng.randint(55, 99)}" for _ in courses]
+        lines.append(f"Term GPA {rng.uniform(60, 95):.2f}")
+        pages.append("\n".join(lines) + "\n\n\f")
+    return "".join(pages)
+
+
+def synthetic_transcript_batch(count: int, min_terms: int = 10, max_terms: int = 20, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [synthetic_transcript_text(rng.randint(min_terms, max_terms), seed=seed + i) for i in range(count)]
+
+
+def synthetic_subjects(count: int) -> List[str]:
+    """count distinct subject codes: SUBJECTS first, then letter-suffixed variants (CSA, COA, ...)"""
+    subjects = []
+    for i in range(count):
+        suffix, n = "", i // len(SUBJECTS)
+        while n:
+            n, letter = divmod(n - 1, 26)
+            suffix = chr(ord("A") + letter) + suffix
+        subjects.append(SUBJECTS[i % len(SUBJECTS)] + suffix)
+    return subjects
+
+
+def synthetic_course_data(courses: int, dim: int = 384, topics: int = 200, seed: int = 0,
+                          json_ready: bool = True, subjects: int = len(SUBJECTS)) -> dict:
+    """
+    Course data in the embedded_courses.json layout. Embeddings are drawn around
+    `topics` random centers so the catalog has the cluster structure of real
+    sentence embeddings (pure noise would make every index look bad).
+    subjects: number of distinct subject codes (the real catalog has about 60)
+    With json_ready=False embeddings stay NumPy rows, which write_embedding_store
+    accepts and which is much faster for large catalogs.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    topic_of = rng.integers(0, topics, size=courses)
+    embeddings = centers[topic_of] + 0.6 * rng.normal(size=(courses, dim)).astype(np.float32)
+
+    names = synthetic_subjects(subjects)
+    data = {}
+    for i in range(courses):
+        subject = names[topic_of[i] % len(names)]
+        code = f"{subject}{100 + i}"
+        data[code] = {
+            "url": f"https://uwflow.com/course/{code.lower()}",
+            "useful_percentage": int(rng.integers(0, 101)),
+            "easy_percentage": int(rng.integers(0, 101)),
+            "liked_percentage": int(rng.integers(30, 101)),
+            "course_description": f"Synthetic course {code} on topic {topic_of[i]}",
+            "reviews": [f"Review {j} of {code}" for j in range(int(rng.integers(0, 4)))],
+            "embedding": embeddings[i].tolist() if json_ready else embeddings[i]
+        }
+    return data
+
+
+def synthetic_transcript_pdf(terms: int, courses_per_term: int = 5, seed: int = 0) -> bytes:
+    """
+    synthetic_transcript_text rendered as a PDF, one term per page, one line per text
+    line (needs reportlab: pip install reportlab).
+    """
+    import io
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for page in synthetic_transcript_text(terms, courses_per_term, seed).split("\f"):
+        lines = page.strip("\n").splitlines()
+        if not lines:
+            continue
+        y = 800
+        for line in lines:
+            if line:
+                pdf.drawString(50, y, line)
+            y -= 15
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
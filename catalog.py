@@ -0,0 +1,137 @@
+"""
+Hot-swappable course catalog.
+
+The recommender is loaded once per catalog file. A reload builds a complete new
+CourseRecommender off the request path (in a thread), validates it, and then
+replaces the reference in one assignment. Handlers take the current snapshot
+once per request, so requests already in flight finish against the old one and
+nothing ever sees a half-loaded catalog. A failed reload keeps serving the old
+snapshot.
+
+Reloads are triggered by POST /admin/reload, SIGHUP (which the pre-fork parent
+forwards to every worker) or, when enabled, by polling the catalog file's
+modification time.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Callable, Optional, Tuple
+
+from embedding_store import sidecar_path
+from reccomender import CourseRecommender
+
+logger = logging.getLogger(__name__)
+
+
+def watched_files(embeddings_file: str) -> Tuple[str, ...]:
+    """Files whose change means a new catalog (a binary store's sidecar is written last)"""
+    if embeddings_file.endswith('.npy'):
+        return (embeddings_file, sidecar_path(embeddings_file))
+    return (embeddings_file,)
+
+
+def file_signature(embeddings_file: str) -> Optional[tuple]:
+    """(mtime, size) of every watched file, or None if one is missing"""
+    try:
+        return tuple((st.st_mtime_ns, st.st_size) for st in map(os.stat, watched_files(embeddings_file)))
+    except FileNotFoundError:
+        return None
+
+
+def catalog_version(embeddings_file: str) -> str:
+    """Short content hash of the catalog (the sidecar for a binary store, it records the matrix checksum)"""
+    digest = hashlib.sha256()
+    with open(watched_files(embeddings_file)[-1], 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class CatalogManager:
+    def __init__(self, embeddings_file: str, factory: Callable[[str], CourseRecommender]):
+        """
+        embeddings_file: catalog path (JSON or binary store) reloaded in place
+        factory: builds a recommender from a path (carries the cache / ANN settings)
+        """
+        self.embeddings_file = embeddings_file
+        self.factory = factory
+        self.reloads = 0
+        self.last_error = None
+        self._lock = asyncio.Lock()
+        self._install(*self._load(embeddings_file))
+
+    def _load(self, embeddings_file: str) -> tuple:
+        """Build and validate a new snapshot; runs in a worker thread during reloads"""
+        signature = file_signature(embeddings_file)
+        started = time.perf_counter()
+        engine = self.factory(embeddings_file)
+        load_seconds = time.perf_counter() - started
+
+        if not engine.all_codes:
+            raise ValueError(f"{embeddings_file} has no courses with embeddings")
+
+        return engine, embeddings_file, catalog_version(embeddings_file), load_seconds, signature
+
+    def _install(self, engine: CourseRecommender, embeddings_file: str, version: str,
+                 load_seconds: float, signature: Optional[tuple]):
+        # A single reference swap; the previous engine is freed once its last request finishes
+        self.engine = engine
+        self.embeddings_file = embeddings_file
+        self.version = version
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self._signature = signature
+
+    async def reload(self, embeddings_file: Optional[str] = None) -> dict:
+        """
+        Load the catalog again (or another file) and swap it in if it is valid.
+        Raises whatever the load raised; the current snapshot stays in place.
+        """
+        async with self._lock:
+            try:
+                snapshot = await asyncio.to_thread(self._load, embeddings_file or self.embeddings_file)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.error("❌ Catalog reload failed, still serving %s: %s", self.version, self.last_error)
+                raise
+
+            previous = self.version
+            self._install(*snapshot)
+            self.reloads += 1
+            self.last_error = None
+            logger.info("🔄 Catalog reloaded: %s -> %s in %.2fs", previous, self.version, self.load_seconds,
+                        extra={"catalog_version": self.version, "load_seconds": self.load_seconds})
+            return self.info()
+
+    def reload_in_background(self) -> asyncio.Task:
+        """Schedule a reload on the running loop (e.g. from a SIGHUP handler); failures are only logged"""
+        task = asyncio.get_running_loop().create_task(self.reload())
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def watch(self, interval: float):
+        """Reload whenever the catalog file changes (polls every interval seconds)"""
+        while True:
+            await asyncio.sleep(interval)
+            signature = file_signature(self.embeddings_file)
+            if signature is None or signature == self._signature:
+                continue
+            try:
+                await self.reload()
+            except Exception:
+                # Don't retry the same broken file every tick
+                self._signature = signature
+
+    def info(self) -> dict:
+        return {
+            "file": self.embeddings_file,
+            "version": self.version,
+            "courses": len(self.engine.all_codes),
+            "load_seconds": round(self.load_seconds, 3),
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,296 @@
+"""
+Binary course embedding store.
+
+The embeddings live in a float32 .npy matrix of L2-normalized rows that the
+server opens with np.load(mmap_mode='r'), so every worker shares the same pages
+through the OS cache instead of parsing JSON floats. A small JSON sidecar next
+to it holds the course codes (in row order), the original embedding norms,
+ratings, URLs and descriptions, plus a format version and a checksum of the
+matrix so stale or mismatched files are rejected at load time.
+
+Reviews are the bulk of the course data and are rarely all needed, so they are
+kept out of line in a JSON-lines file (one course per line, sidecar course
+order) that is read one course at a time through byte offsets in the sidecar.
+
+Optionally the store also carries each course's top-M most similar courses
+(foo.neighbors.npy, memory-mapped like the matrix), which lets the recommender
+answer one- or two-course profiles without scanning the catalog.
+"""
+
+import hashlib
+import json
+import os
+import stat
+import tempfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ann_index import (
+    NEIGHBOR_DTYPE, build_index, course_neighbors, file_checksum, index_path, load_index, neighbors_path
+)
+
+STORE_FORMAT_VERSION = 2
+# Version 1 stores kept reviews inline in the sidecar; they still load
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+
+
+def sidecar_path(matrix_path: str) -> str:
+    """Path of the metadata sidecar for a matrix file (foo.npy -> foo.meta.json)"""
+    return os.path.splitext(matrix_path)[0] + '.meta.json'
+
+
+def reviews_path(matrix_path: str) -> str:
+    """Path of the out-of-line reviews file for a matrix file (foo.npy -> foo.reviews.jsonl)"""
+    return os.path.splitext(matrix_path)[0] + '.reviews.jsonl'
+
+
+def _file_mode(path: str) -> int:
+    """Permissions for a rewritten path: the existing file's, else what open() would give a new file"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def atomic_write(path: str, write: Callable[[str], None]):
+    """
+    Call write(temp_path) on a temp file next to path, then rename it over path, so
+    readers see either the old file or the complete new one, never a partial write.
+    The result keeps path's permissions (mkstemp creates temp files as 0600).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(temp_path)
+        os.chmod(temp_path, _file_mode(path))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def _save_matrix(path: str, matrix: np.ndarray):
+    with open(path, 'wb') as f:
+        np.save(f, matrix)
+
+
+def _save_json(path: str, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def _save_bytes(path: str, chunks: List[bytes]):
+    with open(path, 'wb') as f:
+        f.writelines(chunks)
+
+
+class InMemoryReviews:
+    """Reviews held in a dict (JSON catalogs and version 1 stores)"""
+
+    def __init__(self, reviews: Dict[str, list]):
+        self._reviews = reviews
+
+    def count(self, course_code: str) -> int:
+        return len(self._reviews.get(course_code, ()))
+
+    def get(self, course_code: str, limit: Optional[int] = None, offset: int = 0) -> list:
+        reviews = self._reviews.get(course_code, [])
+        return reviews[offset:None if limit is None else offset + limit]
+
+
+class FileReviews:
+    """
+    Reviews read on demand from a store's JSON-lines file, one course line per call.
+    Uses os.pread on a single descriptor, so it is safe to share between threads.
+    The descriptor keeps pointing at the file it opened even if the store is regenerated.
+    """
+
+    def __init__(self, path: str, codes: List[str], offsets: List[int], counts: List[int]):
+        self.path = path
+        self._index = {code: i for i, code in enumerate(codes)}
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+        self._counts = np.asarray(counts, dtype=np.int32)
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def count(self, course_code: str) -> int:
+        i = self._index.get(course_code)
+        return 0 if i is None else int(self._counts[i])
+
+    def get(self, course_code: str, limit: Optional[int] = None, offset: int = 0) -> list:
+        i = self._index.get(course_code)
+        if i is None or limit == 0 or not self._counts[i]:
+            return []
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        reviews = json.loads(os.pread(self._fd, end - start, start))
+        return reviews[offset:None if limit is None else offset + limit]
+
+    def __del__(self):
+        fd = getattr(self, '_fd', None)
+        if fd is not None:
+            os.close(fd)
+
+
+def matrix_checksum(matrix: np.ndarray) -> str:
+    """SHA-256 of the matrix bytes"""
+    return hashlib.sha256(memoryview(np.ascontiguousarray(matrix)).cast('B')).hexdigest()
+
+
+def write_embedding_store(course_data: Dict[str, dict], matrix_path: str,
+                          ann_index: Optional[str] = None, ann_params: Optional[dict] = None,
+                          neighbors: int = 0) -> Tuple[str, str]:
+    """
+    Write course data (the embedded_courses.json layout) as a binary store.
+    ann_index ('ivf' or 'hnsw') also builds an approximate nearest-neighbour index
+    (see ann_index.py) and saves it next to the matrix.
+    neighbors: also store each course's top-neighbors most similar courses (0 = don't)
+    Returns (matrix_path, sidecar_path).
+    """
+    codes = [code for code, data in course_data.items() if data.get('embedding') is not None and len(data['embedding'])]
+    if codes:
+        raw = np.array([course_data[code]['embedding'] for code in codes], dtype=np.float32)
+    else:
+        raw = np.zeros((0, 0), dtype=np.float32)
+
+    norms = np.linalg.norm(raw, axis=1)
+    safe_norms = np.where(norms > 0, norms, 1.0)
+    matrix = np.ascontiguousarray(raw / safe_norms[:, None], dtype=np.float32)
+
+    # One JSON line of reviews per course, in the sidecar's course order
+    review_lines = [(json.dumps(data.get('reviews') or []) + '\n').encode('utf-8') for data in course_data.values()]
+    review_offsets = np.concatenate(([0], np.cumsum([len(line) for line in review_lines]))).tolist()
+
+    meta = {
+        "format_version": STORE_FORMAT_VERSION,
+        "count": int(matrix.shape[0]),
+        "dimension": int(matrix.shape[1]),
+        "checksum": matrix_checksum(matrix),
+        "codes": codes,
+        "norms": norms.tolist(),
+        "courses": {
+            code: {key: value for key, value in data.items() if key not in ('embedding', 'reviews')}
+            for code, data in course_data.items()
+        }
+    }
+
+    # Every file is replaced atomically and the sidecar goes last; a server that loads
+    # between the renames sees a checksum mismatch and rejects the store
+    atomic_write(matrix_path, lambda path: _save_matrix(path, matrix))
+
+    reviews_file = reviews_path(matrix_path)
+    atomic_write(reviews_file, lambda path: _save_bytes(path, review_lines))
+    meta["reviews"] = {
+        "file": os.path.basename(reviews_file),
+        "checksum": file_checksum(reviews_file),
+        "offsets": review_offsets,
+        "counts": [len(data.get('reviews') or []) for data in course_data.values()]
+    }
+
+    if ann_index and matrix.shape[0]:
+        ann_file = index_path(matrix_path, ann_index)
+        atomic_write(ann_file, build_index(matrix, ann_index, **(ann_params or {})).save)
+        meta["ann_index"] = {
+            "kind": ann_index,
+            "file": os.path.basename(ann_file),
+            "checksum": file_checksum(ann_file)
+        }
+
+    if neighbors > 0 and matrix.shape[0] > 1:
+        neighbors_file = neighbors_path(matrix_path)
+        atomic_write(neighbors_file, lambda path: _save_matrix(path, course_neighbors(matrix, neighbors)))
+        meta["neighbors"] = {
+            "count": min(neighbors, int(matrix.shape[0]) - 1),
+            "file": os.path.basename(neighbors_file),
+            "checksum": file_checksum(neighbors_file)
+        }
+
+    meta_path = sidecar_path(matrix_path)
+    atomic_write(meta_path, lambda path: _save_json(path, meta))
+
+    return matrix_path, meta_path
+
+
+def load_embedding_store(matrix_path: str, verify_checksum: bool = True) -> Tuple[np.ndarray, dict]:
+    """
+    Open a binary store. The matrix is memory-mapped read-only.
+    Raises ValueError if the files are from another format version or don't match each other.
+    """
+    meta_path = sidecar_path(matrix_path)
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+
+    version = meta.get("format_version")
+    if version not in SUPPORTED_FORMAT_VERSIONS:
+        raise ValueError(f"{meta_path} has format version {version}, expected one of {SUPPORTED_FORMAT_VERSIONS}")
+
+    if meta["count"]:
+        matrix = np.load(matrix_path, mmap_mode='r')
+    else:
+        matrix = np.load(matrix_path)
+
+    expected_shape = (meta["count"], meta["dimension"])
+    if matrix.dtype != np.float32 or matrix.shape != expected_shape:
+        raise ValueError(
+            f"{matrix_path} is {matrix.dtype}{matrix.shape}, sidecar expects float32{expected_shape}"
+        )
+    if len(meta["codes"]) != meta["count"] or len(meta["norms"]) != meta["count"]:
+        raise ValueError(f"{meta_path} is inconsistent: codes/norms don't match the row count")
+    if verify_checksum and matrix_checksum(matrix) != meta["checksum"]:
+        raise ValueError(f"{matrix_path} checksum does not match {meta_path} (stale or partially written store)")
+
+    return matrix, meta
+
+
+def load_store_index(matrix_path: str, meta: dict):
+    """
+    Load the ANN index recorded in a store's sidecar, or None if the store has none.
+    Raises ValueError if the index file doesn't match the sidecar.
+    """
+    info = meta.get("ann_index")
+    if not info:
+        return None
+
+    ann_file = os.path.join(os.path.dirname(matrix_path), info["file"])
+    if file_checksum(ann_file) != info["checksum"]:
+        raise ValueError(f"{ann_file} checksum does not match {sidecar_path(matrix_path)}")
+    return load_index(ann_file, info["kind"], meta["dimension"], meta["count"])
+
+
+def load_store_neighbors(matrix_path: str, meta: dict, verify_checksum: bool = True) -> Optional[np.ndarray]:
+    """
+    Memory-mapped (count, M) neighbour lists recorded in a store's sidecar, or None
+    if the store has none. Raises ValueError if the file doesn't match the sidecar.
+    """
+    info = meta.get("neighbors")
+    if not info:
+        return None
+
+    neighbors_file = os.path.join(os.path.dirname(matrix_path), info["file"])
+    if verify_checksum and file_checksum(neighbors_file) != info["checksum"]:
+        raise ValueError(f"{neighbors_file} checksum does not match {sidecar_path(matrix_path)}")
+    neighbors = np.load(neighbors_file, mmap_mode='r')
+    if neighbors.dtype != NEIGHBOR_DTYPE or neighbors.shape != (meta["count"], info["count"]):
+        raise ValueError(
+            f"{neighbors_file} is {neighbors.dtype}{neighbors.shape}, "
+            f"sidecar expects {NEIGHBOR_DTYPE}{(meta['count'], info['count'])}"
+        )
+    return neighbors
+
+
+def load_store_reviews(matrix_path: str, meta: dict, verify_checksum: bool = True):
+    """
+    Review source for a store: FileReviews for the out-of-line file, or the inline
+    reviews of a version 1 sidecar. Raises ValueError if the file doesn't match the sidecar.
+    """
+    info = meta.get("reviews")
+    if not info:
+        return InMemoryReviews({code: data.get('reviews') or [] for code, data in meta["courses"].items()})
+
+    reviews_file = os.path.join(os.path.dirname(matrix_path), info["file"])
+    if verify_checksum and file_checksum(reviews_file) != info["checksum"]:
+        raise ValueError(f"{reviews_file} checksum does not match {sidecar_path(matrix_path)}")
+    return FileReviews(reviews_file, list(meta["courses"]), info["offsets"], info["counts"])
@@ -2,22 +2,77 @@
 """
 Local script to generate embeddings for all courses.
 Run this on your local machine with sentence-transformers installed.
+
+Only courses whose description (or the model) changed since the last run are
+re-encoded: each course stores a hash of what its embedding was computed from.
+Use --stub-model to run the whole pipeline offline with deterministic fake embeddings.
 """
 
+import argparse
+import hashlib
 import json
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import os
+from typing import List, Optional
+from embedding_store import atomic_write, write_embedding_store
+
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+# Most similar courses stored per course in the binary store (small-profile fast path)
+DEFAULT_NEIGHBORS = 50
+
+class StubEmbeddingModel:
+    """Deterministic offline stand-in for SentenceTransformer (embeddings derived from a text hash)"""
+    
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+    
+    def encode(self, sentences, batch_size: int = 32, **kwargs) -> np.ndarray:
+        embeddings = np.empty((len(sentences), self.dimension), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            seed = int.from_bytes(hashlib.sha256(sentence.encode('utf-8')).digest()[:8], 'little')
+            embedding = np.random.default_rng(seed).normal(size=self.dimension)
+            embeddings[i] = embedding / np.linalg.norm(embedding)
+        return embeddings
 
-def generate_course_embeddings():
+def embedding_hash(model_name: str, description: str) -> str:
+    """What an embedding was computed from; a changed description or model means re-encoding"""
+    return hashlib.sha256(f"{model_name}\0{description}".encode('utf-8')).hexdigest()
+
+def encode_descriptions(model, descriptions: List[str], batch_size: int = 64, processes: int = 1) -> np.ndarray:
+    """Encode in batches; processes > 1 uses sentence-transformers' multi-process pool"""
+    if processes > 1 and hasattr(model, 'start_multi_process_pool'):
+        pool = model.start_multi_process_pool(target_devices=['cpu'] * processes)
+        try:
+            return model.encode_multi_process(descriptions, pool, batch_size=batch_size)
+        finally:
+            model.stop_multi_process_pool(pool)
+    return model.encode(descriptions, batch_size=batch_size, show_progress_bar=len(descriptions) > batch_size)
+
+def load_model(model_name: str = DEFAULT_MODEL, stub: bool = False):
+    if stub:
+        print("🧪 Using the deterministic stub embedding model (offline)")
+        return StubEmbeddingModel()
+    
     print("🤖 Loading SentenceTransformer model locally...")
+    from sentence_transformers import SentenceTransformer
     
     # Load the best model locally (we have time and resources!)
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    model = SentenceTransformer(model_name)
     print("✅ Model loaded successfully!")
-    
+    return model
+
+def generate_course_embeddings(binary_output: Optional[str] = 'embedded_courses.npy',
+                               ann_index: Optional[str] = None, ann_params: Optional[dict] = None,
+                               embeddings_file: str = 'embedded_courses.json', model=None,
+                               model_name: str = DEFAULT_MODEL, batch_size: int = 64,
+                               processes: int = 1, force: bool = False, neighbors: int = DEFAULT_NEIGHBORS):
+    """
+    Embed new or changed course descriptions and rewrite embeddings_file (and the binary store).
+    model: anything with SentenceTransformer's encode(); loaded from model_name when None
+    force: re-encode every course even if its hash is unchanged
+    neighbors: most similar courses precomputed per course in the binary store (0 = none)
+    """
     # Load existing course data
-    embeddings_file = 'embedded_courses.json'
     if os.path.exists(embeddings_file):
         print(f"📂 Loading existing course data from {embeddings_file}")
         with open(embeddings_file, 'r') as f:
@@ -52,43 +107,93 @@ def generate_course_embeddings():
             }
         }
     
-    # Generate embeddings for all courses
-    print(f"🔧 Generating embeddings for {len(course_data)} courses...")
-    
+    # Work out which courses need (re-)encoding
     embedded_courses = {}
+    stale = []
     for course_code, data in course_data.items():
-        print(f"  📚 Processing {course_code}...")
-        
         # Copy all existing data
-        embedded_courses[course_code] = data.copy()
+        embedded_courses[course_code] = dict(data)
+        
+        description = data.get('course_description')
+        if not description:
+            print(f"  ⚠️ No description found for {course_code}")
+            continue
+        
+        content_hash = embedding_hash(model_name, description)
+        if force or not data.get('embedding') or data.get('embedding_hash') != content_hash:
+            stale.append((course_code, description, content_hash))
+    
+    print(f"🔧 {len(stale)} of {len(course_data)} courses are new or changed and need embeddings")
+    
+    if stale:
+        if model is None:
+            model = load_model(model_name)
         
-        # Generate embedding from course description
-        if 'course_description' in data and data['course_description']:
-            description = data['course_description']
-            print(f"    🧠 Generating embedding for: {description[:50]}...")
-            
-            # Generate embedding using the model
-            embedding = model.encode(description)
-            
+        embeddings = encode_descriptions(model, [description for _, description, _ in stale], batch_size, processes)
+        for (course_code, _, content_hash), embedding in zip(stale, embeddings):
             # Convert to list for JSON serialization
-            embedded_courses[course_code]['embedding'] = embedding.tolist()
-            
-            print(f"    ✅ Generated {len(embedding)}-dimensional embedding")
-        else:
-            print(f"    ⚠️ No description found for {course_code}")
+            embedded_courses[course_code]['embedding'] = np.asarray(embedding, dtype=np.float32).tolist()
+            embedded_courses[course_code]['embedding_hash'] = content_hash
     
-    # Save the embedded courses
-    output_file = 'embedded_courses.json'
+    # Save the embedded courses (temp file + rename so a running server never sees a partial file)
+    output_file = embeddings_file
     print(f"💾 Saving embedded courses to {output_file}")
     
-    with open(output_file, 'w') as f:
-        json.dump(embedded_courses, f, indent=2)
+    def save(path):
+        with open(path, 'w') as f:
+            json.dump(embedded_courses, f)
+    
+    atomic_write(output_file, save)
     
-    print(f"🎉 Successfully generated embeddings for {len(embedded_courses)} courses!")
-    print(f"📊 Embedding dimension: {len(embedded_courses[list(embedded_courses.keys())[0]]['embedding'])}")
+    dimensions = {len(data['embedding']) for data in embedded_courses.values() if data.get('embedding')}
+    print(f"🎉 {len(embedded_courses)} courses, {len(stale)} newly embedded")
+    print(f"📊 Embedding dimension: {', '.join(map(str, sorted(dimensions))) or 'n/a'}")
     print(f"📁 File size: {os.path.getsize(output_file) / 1024:.1f} KB")
     
+    # Binary store for the server: memory-mapped float32 matrix + metadata sidecar
+    if binary_output:
+        matrix_file, meta_file = write_embedding_store(embedded_courses, binary_output, ann_index, ann_params,
+                                                      neighbors)
+        print(f"💾 Saved binary store to {matrix_file} ({os.path.getsize(matrix_file) / 1024:.1f} KB) "
+              f"and {meta_file} ({os.path.getsize(meta_file) / 1024:.1f} KB)")
+    
     return embedded_courses
 
 if __name__ == "__main__":
-    generate_course_embeddings()
+    parser = argparse.ArgumentParser(description="Generate course embeddings")
+    parser.add_argument("--binary-output", default="embedded_courses.npy",
+                        help="Path of the binary embedding store to write (sidecar is written next to it)")
+    parser.add_argument("--no-binary", action="store_true", help="Only write embedded_courses.json")
+    parser.add_argument("--ann-index", choices=["ivf", "hnsw"],
+                        help="Also build an approximate nearest-neighbour index (for very large catalogs)")
+    parser.add_argument("--ann-nlist", type=int, help="IVF: number of inverted lists (default 4*sqrt(courses))")
+    parser.add_argument("--ann-m", type=int, default=16, help="HNSW: graph degree")
+    parser.add_argument("--neighbors", type=int, default=DEFAULT_NEIGHBORS,
+                        help="Most similar courses precomputed per course in the binary store (0 disables)")
+    parser.add_argument("--embeddings-file", default="embedded_courses.json", help="Course data to update in place")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="SentenceTransformer model name")
+    parser.add_argument("--stub-model", action="store_true",
+                        help="Use deterministic fake embeddings instead of a real model (offline testing)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Descriptions per encode batch")
+    parser.add_argument("--processes", type=int, default=1, help="Encoding processes (sentence-transformers pool)")
+    parser.add_argument("--force", action="store_true", help="Re-encode every course")
+    args = parser.parse_args()
+    
+    ann_params = {}
+    if args.ann_index == "ivf" and args.ann_nlist:
+        ann_params["nlist"] = args.ann_nlist
+    elif args.ann_index == "hnsw":
+        ann_params["m"] = args.ann_m
+    
+    generate_course_embeddings(
+        binary_output=None if args.no_binary else args.binary_output,
+        ann_index=args.ann_index,
+        ann_params=ann_params,
+        embeddings_file=args.embeddings_file,
+        model=load_model(stub=True) if args.stub_model else None,
+        model_name="stub" if args.stub_model else args.model,
+        batch_size=args.batch_size,
+        processes=args.processes,
+        force=args.force,
+        neighbors=args.neighbors
+    )
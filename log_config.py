@@ -0,0 +1,46 @@
+"""
+Logging setup for the API process.
+
+Modules log through logging.getLogger(__name__); nothing is printed on the
+request path. LOG_LEVEL picks the level (INFO by default; per-request and
+per-line details are DEBUG) and LOG_FORMAT=json emits one JSON object per line,
+including any extra= fields passed to the log call.
+"""
+
+import json
+import logging
+import os
+import sys
+
+# Attributes every LogRecord has; anything else came in through extra=
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level: str = None, fmt: str = None):
+    """Configure the root logger from arguments or LOG_LEVEL / LOG_FORMAT"""
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.environ.get("LOG_FORMAT", "text")).lower()
+    
+    handler = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
@@ -1,15 +1,86 @@
-from fastapi import FastAPI, UploadFile, File
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import asyncio
 import json
-import uvicorn
-import tempfile
+import logging
+import signal
+import time
 import os
+import sys
 from reccomender import CourseRecommender
-from pdfparser import extract_courses_separate_lists
+from reranker import DiversityReranker
+from catalog import CatalogManager
+from pdf_worker import TranscriptParserPool, TranscriptPoolBusy
+from recommend_pool import RecommendationPool, RecommendationPoolBusy
+from pdfparser import CourseRecord
+from upload_cache import CachedTranscript, create_upload_cache, upload_key
+from log_config import configure_logging
+from metrics import Counter, Gauge, Histogram, observe_stage, render_metrics
 
-app = FastAPI()
+if __name__ == "__main__":
+    # Serve through the launcher: processes started from the PDF pool's fork server re-import the
+    # __main__ module, and as __main__ this one would load the whole catalog in each of them
+    os.execv(sys.executable, [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "serve.py")])
+
+configure_logging()
+logger = logging.getLogger("main")
+
+# PDF extraction runs in worker processes so a large transcript can't block the event loop
+pdf_pool = TranscriptParserPool(
+    max_workers=int(os.environ.get("PDF_WORKERS", 2)),
+    max_queue=int(os.environ.get("PDF_QUEUE_SIZE", 8)),
+    timeout=float(os.environ.get("PDF_TIMEOUT", 30)),
+    max_pages=int(os.environ.get("PDF_MAX_PAGES", 20)),
+    retry_after=int(os.environ.get("PDF_RETRY_AFTER", 5))
+)
+
+# Recommendations run on threads (NumPy releases the GIL); identical concurrent requests share one run
+recommend_pool = RecommendationPool(
+    max_workers=int(os.environ.get("RECOMMEND_WORKERS", 4)),
+    max_in_flight=int(os.environ.get("RECOMMEND_MAX_IN_FLIGHT", 64)),
+    retry_after=int(os.environ.get("RECOMMEND_RETRY_AFTER", 1))
+)
+
+# Repeat uploads of the same PDF skip extraction (only course codes are cached)
+upload_cache = create_upload_cache(
+    path=os.environ.get("UPLOAD_CACHE_PATH"),
+    maxsize=int(os.environ.get("UPLOAD_CACHE_SIZE", 256)),
+    ttl=float(os.environ.get("UPLOAD_CACHE_TTL", 3600))
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Optional file watcher: reload the catalog when embeddings are regenerated
+    watch_interval = float(os.environ.get("CATALOG_WATCH_INTERVAL", 0))
+    watcher = asyncio.create_task(catalog.watch(watch_interval)) if watch_interval > 0 else None
+    # kill -HUP reloads the catalog (in pre-fork mode the parent forwards it to every worker)
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, catalog.reload_in_background)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        # No SIGHUP on Windows, and signal handlers only work on the main thread (not under TestClient)
+        pass
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    pdf_pool.shutdown()
+    recommend_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+REQUEST_SECONDS = Histogram("watcourse_request_seconds", "HTTP request latency by route", ["method", "route", "status"])
+
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # The route template (not the raw path) keeps label cardinality bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    REQUEST_SECONDS.labels(request.method, route, response.status_code).observe(time.perf_counter() - started)
+    return response
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,127 +91,347 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
-engine = CourseRecommender()
+# Prefer the binary store written by generate_embeddings.py; fall back to the JSON file
+EMBEDDINGS_FILE = os.environ.get("EMBEDDINGS_FILE") or (
+    "embedded_courses.npy" if os.path.exists("embedded_courses.npy") else "embedded_courses.json"
+)
+
+def build_engine(embeddings_file: str) -> CourseRecommender:
+    return CourseRecommender(
+        embeddings_file,
+        cache_size=int(os.environ.get("RECOMMEND_CACHE_SIZE", 1024)),
+        cache_ttl=float(os.environ.get("RECOMMEND_CACHE_TTL", 600)),
+        ann_exact_threshold=int(os.environ.get("ANN_EXACT_THRESHOLD", 50000)),
+        ann_overfetch=int(os.environ.get("ANN_OVERFETCH", 20)),
+        ann_params={
+            "nprobe": int(os.environ.get("ANN_NPROBE", 0)) or None,
+            "ef": int(os.environ.get("ANN_EF", 0)) or None
+        },
+        neighbor_max_profile=int(os.environ.get("NEIGHBOR_MAX_PROFILE", 2)),
+        reranker=DiversityReranker(
+            k=int(os.environ.get("RECOMMEND_K", 5)),
+            mode=os.environ.get("DIVERSITY_MODE", "department"),
+            department_cap=int(os.environ.get("DEPARTMENT_CAP", 0)) or None,
+            overfetch=int(os.environ.get("RERANK_OVERFETCH", 10)),
+            mmr_lambda=float(os.environ.get("MMR_LAMBDA", 0.7))
+        )
+    )
+
+# Handlers read catalog.engine once per request; a reload swaps it atomically
+catalog = CatalogManager(EMBEDDINGS_FILE, build_engine)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+# Reviews embedded per recommendation unless a request asks for more; the rest come from /courses/{code}/reviews
+DEFAULT_MAX_REVIEWS = int(os.environ.get("RESPONSE_MAX_REVIEWS", 2))
+# A batch runs as one pool job, so its size bounds how long it holds a recommendation thread
+BATCH_MAX_STUDENTS = int(os.environ.get("RECOMMEND_BATCH_MAX", 256))
+
+Gauge("watcourse_recommendation_cache_hit_rate", "Recommendation result cache hit rate").set_function(
+    lambda: catalog.engine.cache_stats()["hit_rate"]
+)
+Gauge("watcourse_catalog_courses", "Courses with embeddings in the loaded catalog").set_function(
+    lambda: len(catalog.engine.all_codes)
+)
+Gauge("watcourse_pdf_jobs_in_flight", "PDF parse jobs running or queued").set_function(lambda: pdf_pool.in_flight)
+Gauge("watcourse_recommend_in_flight", "Distinct recommendation computations running or queued").set_function(
+    lambda: recommend_pool.in_flight
+)
+Gauge("watcourse_recommend_queue_depth", "Recommendation computations waiting for a thread").set_function(
+    lambda: recommend_pool.queue_depth
+)
+Gauge("watcourse_upload_cache_hit_rate", "Transcript upload dedup cache hit rate").set_function(
+    lambda: upload_cache.stats()["hit_rate"]
+)
+UPLOAD_CACHE_LOOKUPS = Counter("watcourse_upload_cache_lookups_total", "Transcript upload dedup cache lookups", ["result"])
 
 class CourseRequest(BaseModel):
     completed_courses: List[str]
+    k: Optional[int] = Field(None, ge=1, le=50)
+    max_reviews: int = Field(DEFAULT_MAX_REVIEWS, ge=0)
+
+class BatchCourseRequest(BaseModel):
+    students: List[List[str]] = Field(..., max_length=BATCH_MAX_STUDENTS)
+    k: Optional[int] = Field(None, ge=1, le=50)
+    max_reviews: int = Field(DEFAULT_MAX_REVIEWS, ge=0)
+
+class ReloadRequest(BaseModel):
+    embeddings_file: Optional[str] = None
+
+async def _recommend(completed_courses: List[str], k: Optional[int] = None) -> list:
+    """Recommendations computed on the thread pool; concurrent identical requests share one computation"""
+    engine = catalog.engine
+    key = (id(engine), engine.canonical_completed(completed_courses), k or engine.reranker.k)
+    return await recommend_pool.run(key, engine.recommend, completed_courses, k)
 
 @app.post("/recommend")
 async def reccomend_courses(request: CourseRequest):
-    request_json = json.dumps({"completed_courses": request.completed_courses})
-    response_json = engine.recommend_courses_json(request_json)
-    response = json.loads(response_json)
+    try:
+        recommendations = await _recommend(request.completed_courses, request.k)
+    except RecommendationPoolBusy as busy:
+        return _busy_response(busy)
+    except Exception as e:
+        logger.exception("Error getting recommendations: %s", e)
+        recommendations = []
     
-    course_codes = [rec["course_code"] for rec in response.get("recommendations", [])]
+    course_codes = [rec.course_code for rec in recommendations]
     
     return {"recommendations": course_codes}
 
 @app.post("/recommend-from-courses")
 async def recommend_from_courses(request: CourseRequest):
     try:
-        request_json = json.dumps({"completed_courses": request.completed_courses})
-        response_json = engine.recommend_courses_json(request_json)
-        response = json.loads(response_json)
-        
-        if "error" in response:
-            return {"error": response["error"], "recommendations": []}
+        recommendations = await _recommend(request.completed_courses, request.k)
         
         return {
             "completed_courses": request.completed_courses,
-            "recommendations": response.get("recommendations", []),
-            "total_recommendations": len(response.get("recommendations", []))
+            "recommendations": [rec.to_dict(request.max_reviews) for rec in recommendations],
+            "total_recommendations": len(recommendations)
         }
         
+    except RecommendationPoolBusy as busy:
+        return _busy_response(busy)
     except Exception as e:
         return {"error": f"Error getting recommendations: {str(e)}", "recommendations": []}
 
+@app.post("/recommend/batch")
+async def recommend_batch(request: BatchCourseRequest):
+    try:
+        results = await recommend_pool.run(None, catalog.engine.recommend_batch, request.students, request.k)
+        
+        return {
+            "results": [
+                {
+                    "completed_courses": completed,
+                    "recommendations": [rec.to_dict(request.max_reviews) for rec in recommendations],
+                    "total_recommendations": len(recommendations)
+                }
+                for completed, recommendations in zip(request.students, results)
+            ],
+            "total_students": len(results)
+        }
+        
+    except RecommendationPoolBusy as busy:
+        return _busy_response(busy)
+    except Exception as e:
+        return {"error": f"Error getting recommendations: {str(e)}", "results": []}
+
 # Removed manual OPTIONS handler - let CORS middleware handle it automatically
 
 @app.get("/")
 async def root():
-    print("🏠 Root endpoint accessed")
     return {"message": "FastAPI backend is running!", "status": "healthy"}
 
 @app.get("/health")
 async def health():
-    print("💚 Health check endpoint accessed")
-    return {"status": "healthy", "service": "FastAPI Backend"}
+    return {"status": "healthy", "service": "FastAPI Backend", "catalog": catalog.info()}
+
+@app.get("/stats")
+async def stats():
+    return {
+        "recommendation_cache": catalog.engine.cache_stats(),
+        "upload_cache": upload_cache.stats(),
+        "pdf_pool": pdf_pool.stats(),
+        "recommend_pool": recommend_pool.stats()
+    }
+
+@app.get("/courses/{course_code}/reviews")
+async def course_reviews(course_code: str, offset: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=200)):
+    engine = catalog.engine
+    course_code = course_code.upper()
+    if course_code not in engine.course_index:
+        return JSONResponse(status_code=404, content={"error": f"Unknown course {course_code}"})
+    
+    reviews = engine.get_reviews(course_code, limit, offset)
+    return {
+        "course_code": course_code,
+        "reviews": reviews,
+        "offset": offset,
+        "total_reviews": engine.reviews.count(course_code)
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.post("/admin/reload")
+async def reload_catalog(request: Optional[ReloadRequest] = None, x_admin_token: Optional[str] = Header(None)):
+    # Disabled unless ADMIN_TOKEN is set
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        return JSONResponse(status_code=403, content={"error": "Reload not allowed"})
+    
+    try:
+        return {"status": "reloaded", "catalog": await catalog.reload(request.embeddings_file if request else None)}
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Error reloading catalog: {str(e)}", "catalog": catalog.info()}
+        )
+
+def _cached_parse(cached: CachedTranscript) -> dict:
+    # Seen this exact file before: no extraction. Grades and terms aren't cached
+    records = [CourseRecord(subject, number, None, None) for subject, number in cached.courses]
+    return {"raw_text_length": cached.raw_text_length, "courses": records, "timings": {}}
+
+def _record_parse(key: str, parsed: dict):
+    """Cache a fresh parse (course codes only) and record its stage timings"""
+    upload_cache.put(key, CachedTranscript(
+        tuple((record.subject, record.number) for record in parsed["courses"]),
+        parsed["raw_text_length"]
+    ))
+    for stage, seconds in parsed["timings"].items():
+        observe_stage(stage, seconds)
+
+async def _upload_recommendations(full_courses: List[str], max_reviews: int) -> list:
+    """Recommendations for an upload; RecommendationPoolBusy propagates (the caller answers 429)"""
+    if not full_courses:
+        return []
+    try:
+        return [rec.to_dict(max_reviews) for rec in await _recommend(full_courses)]
+    except RecommendationPoolBusy:
+        raise
+    except Exception as rec_error:
+        logger.exception("Error getting recommendations: %s", rec_error)
+        return []
+
+def _upload_response(file: UploadFile, contents: bytes, parsed: dict, cached: bool, recommendations: list) -> dict:
+    records = parsed["courses"]
+    full_courses = [record.code for record in records]
+    return {
+        "filename": file.filename,
+        "size": len(contents),
+        "message": "PDF processed successfully",
+        "status": "processed",
+        "cached": cached,
+        "extracted_courses": full_courses,
+        "course_codes": [record.subject for record in records],
+        "course_numbers": [record.number for record in records],
+        "courses": [
+            {"course_code": record.code, "grade": record.grade, "term": record.term}
+            for record in records
+        ],
+        "raw_text_length": parsed["raw_text_length"],
+        "recommendations": recommendations,
+        "total_courses_found": len(full_courses),
+        "total_recommendations": len(recommendations)
+    }
+
+def _busy_response(busy) -> JSONResponse:
+    """429 for a saturated pool (TranscriptPoolBusy or RecommendationPoolBusy)"""
+    logger.warning("⏳ %s, rejecting request", busy)
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(busy)},
+        headers={"Retry-After": str(busy.retry_after)}
+    )
+
+def _timeout_error() -> str:
+    logger.warning("⌛ PDF parsing timed out after %ss", pdf_pool.timeout)
+    return f"Processing the PDF took longer than {pdf_pool.timeout:g}s"
+
+async def _upload_events(file: UploadFile, contents: bytes, key: str, cached: Optional[CachedTranscript],
+                         stream, max_reviews: int):
+    """
+    Events of a streaming upload: "page" (course codes found so far) per extracted page,
+    "courses" once parsing is done, "recommendations", then "done" with the full
+    /upload-pdf response. Failures end the stream with an "error" event (with retry_after
+    when the recommender is saturated).
+    """
+    try:
+        if cached is not None:
+            parsed = _cached_parse(cached)
+        else:
+            async for event in stream.events():
+                if event["event"] == "page":
+                    yield event
+                else:
+                    parsed = event
+            _record_parse(key, parsed)
+        
+        full_courses = [record.code for record in parsed["courses"]]
+        yield {
+            "event": "courses",
+            "extracted_courses": full_courses,
+            "courses": [
+                {"course_code": record.code, "grade": record.grade, "term": record.term}
+                for record in parsed["courses"]
+            ],
+            "raw_text_length": parsed["raw_text_length"]
+        }
+        
+        recommendations = await _upload_recommendations(full_courses, max_reviews)
+        yield {"event": "recommendations", "recommendations": recommendations}
+        yield {"event": "done", **_upload_response(file, contents, parsed, cached is not None, recommendations)}
+    
+    except asyncio.TimeoutError:
+        yield {"event": "error", "error": _timeout_error()}
+    except RecommendationPoolBusy as busy:
+        # The parse is cached by now, so a retry only waits for the recommender
+        logger.warning("⏳ %s, ending upload stream", busy)
+        yield {"event": "error", "error": str(busy), "retry_after": busy.retry_after}
+    except Exception as e:
+        yield {"event": "error", "error": f"Error processing PDF: {str(e)}"}
+    finally:
+        # Client went away (or anything else ended the stream early): stop the worker
+        if stream is not None:
+            stream.cancel()
+
+async def _format_events(events, stream_format: str):
+    try:
+        async for event in events:
+            if stream_format == "sse":
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            else:
+                yield json.dumps(event) + "\n"
+    finally:
+        # Close the event source now (not at garbage collection) so a disconnect cancels the job
+        await events.aclose()
 
 @app.post("/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...)):
-    print(f"📁 Received upload request - File: {file.filename}")
-    print(f"📝 Content type: {file.content_type}")
+async def upload_pdf(file: UploadFile = File(...), max_reviews: int = Query(DEFAULT_MAX_REVIEWS, ge=0),
+                     stream: Optional[str] = Query(None, pattern="^(ndjson|sse)$")):
+    """stream=ndjson or stream=sse sends progress events instead of one response at the end"""
+    logger.info("📁 Received upload request", extra={"upload_filename": file.filename, "content_type": file.content_type})
     
     if not file.filename.endswith('.pdf'):
-        print("❌ Invalid file type - not PDF")
+        logger.info("❌ Invalid file type - not PDF")
         return {"error": "File must be a PDF"}
     
     try:
         contents = await file.read()
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(contents)
-            temp_file_path = temp_file.name
+        key = upload_key(contents, pdf_pool.max_pages)
+        cached = upload_cache.get(key)
+        UPLOAD_CACHE_LOOKUPS.labels("hit" if cached is not None else "miss").inc()
+        
+        if stream:
+            try:
+                # Started before the response so a saturated pool is still a plain 429
+                job = await pdf_pool.start_stream(contents) if cached is None else None
+            except TranscriptPoolBusy as busy:
+                return _busy_response(busy)
+            return StreamingResponse(
+                _format_events(_upload_events(file, contents, key, cached, job, max_reviews), stream),
+                media_type="text/event-stream" if stream == "sse" else "application/x-ndjson",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
+        if cached is not None:
+            parsed = _cached_parse(cached)
+        else:
+            try:
+                parsed = await pdf_pool.parse(contents)
+            except TranscriptPoolBusy as busy:
+                return _busy_response(busy)
+            except asyncio.TimeoutError:
+                return JSONResponse(status_code=504, content={"error": _timeout_error()})
+            _record_parse(key, parsed)
+        
+        logger.debug("📄 Extracted text length: %d", parsed["raw_text_length"])
         
         try:
-            from pdfminer.high_level import extract_text
-            extracted_text = extract_text(temp_file_path)
-            
-            print(f"📄 Extracted text length: {len(extracted_text)}")
-            print(f"📝 Sample text: {extracted_text[:200]}...")
-            
-            course_codes, course_numbers = extract_courses_separate_lists(extracted_text)
-            
-            full_courses = []
-            for i in range(len(course_codes)):
-                if i < len(course_numbers):
-                    full_courses.append(course_codes[i] + course_numbers[i])
-            
-            recommendations = []
-            if full_courses:
-                try:
-                    request_data = {"completed_courses": full_courses}
-                    request_json = json.dumps(request_data)
-                    
-                    recommendations_json = engine.recommend_courses_json(request_json)
-                    recommendations_data = json.loads(recommendations_json)
-                    
-                    if "error" not in recommendations_data:
-                        recommendations = recommendations_data.get("recommendations", [])
-                    else:
-                        recommendations = []
-                        
-                except Exception as rec_error:
-                    print(f"Error getting recommendations: {rec_error}")
-                    recommendations = []
-            
-            os.unlink(temp_file_path)
-            
-            return {
-                "filename": file.filename,
-                "size": len(contents),
-                "message": "PDF processed successfully",
-                "status": "processed",
-                "extracted_courses": full_courses,
-                "course_codes": course_codes,
-                "course_numbers": course_numbers,
-                "raw_text_length": len(extracted_text),
-                "recommendations": recommendations,
-                "total_courses_found": len(full_courses),
-                "total_recommendations": len(recommendations)
-            }
-            
-        except Exception as parse_error:
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-            raise parse_error
+            recommendations = await _upload_recommendations([record.code for record in parsed["courses"]], max_reviews)
+        except RecommendationPoolBusy as busy:
+            return _busy_response(busy)
+        return _upload_response(file, contents, parsed, cached is not None, recommendations)
             
     except Exception as e:
         return {"error": f"Error processing PDF: {str(e)}"}
-
-if __name__ == "__main__":
-    import os
-    port = int(os.environ.get("PORT", 12000))
-    print(f"🚀 Starting FastAPI server on port {port}")
-    print(f"🔗 Visit /docs for API documentation")
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
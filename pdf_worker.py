@@ -0,0 +1,270 @@
+"""
+Transcript PDF parsing off the event loop.
+
+pdfminer is pure Python and CPU bound, so extraction and course parsing run in a
+ProcessPoolExecutor. The pool only accepts a bounded number of jobs (running +
+queued); past that, submit raises TranscriptPoolBusy so the API can answer 429
+instead of queueing without limit. Each job has a timeout and a page limit.
+
+A job that outlives its timeout is not left running: pdfminer can hang on a
+hostile PDF, and the stuck worker would hold its slot (and soon the whole pool)
+forever, so the pool's processes are terminated and a fresh pool is started.
+Workers come from a fork server rather than a plain fork(), since the API
+process already runs threads (the recommendation pool) by then.
+
+Streaming jobs (start_stream) report progress page by page through a manager
+queue and check a cancel flag between pages, so a client that disconnects stops
+the extraction instead of leaving it to run to the end.
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator
+
+from pdfparser import extract_transcript_text, iter_transcript_pages, parse_transcript_courses
+
+logger = logging.getLogger(__name__)
+
+# Start method for workers and the manager: forking a process that runs threads can deadlock the child
+MP_CONTEXT = multiprocessing.get_context("forkserver")
+
+# How often the event loop side checks a streaming job's queue for progress
+STREAM_POLL_SECONDS = 0.05
+
+
+class TranscriptPoolBusy(Exception):
+    """Raised when the pool already has its maximum number of jobs in flight"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Transcript parser is busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _warm_import():
+    """Worker initializer: pay the pdfminer import once per process, not per job"""
+    import pdfminer.high_level  # noqa: F401
+
+
+def parse_transcript(contents: bytes, max_pages: int = 0) -> dict:
+    """
+    Extract text from PDF bytes and parse the course sections (runs in a worker process).
+    max_pages=0 means no limit.
+    """
+    # Parsed straight from memory, page by page, stopping after the course sections
+    started = time.perf_counter()
+    extracted_text = extract_transcript_text(io.BytesIO(contents), max_pages=max_pages)
+    extracted = time.perf_counter()
+    courses = parse_transcript_courses(extracted_text)
+
+    # Stage timings travel back with the result; metrics are recorded in the API process
+    return {
+        "raw_text_length": len(extracted_text),
+        "courses": courses,
+        "timings": {"pdf_extract": extracted - started, "parse": time.perf_counter() - extracted}
+    }
+
+
+def parse_transcript_streaming(contents: bytes, max_pages: int, events, cancel) -> dict:
+    """
+    parse_transcript, reporting ("page", number, course codes so far) on events after
+    every page. Returns None as soon as cancel is set (checked between pages).
+    """
+    started = time.perf_counter()
+    parse_seconds = 0.0
+    pages = []
+    for page_text in iter_transcript_pages(io.BytesIO(contents), max_pages=max_pages):
+        if cancel.is_set():
+            return None
+        pages.append(page_text)
+        # Terms can straddle pages, so the preview re-parses everything read so far
+        parse_started = time.perf_counter()
+        codes = [record.code for record in parse_transcript_courses(''.join(pages))]
+        parse_seconds += time.perf_counter() - parse_started
+        events.put(("page", len(pages), codes))
+
+    extracted_text = ''.join(pages)
+    extracted = time.perf_counter()
+    courses = parse_transcript_courses(extracted_text)
+    return {
+        "raw_text_length": len(extracted_text),
+        "courses": courses,
+        "pages": len(pages),
+        "timings": {
+            "pdf_extract": extracted - started - parse_seconds,
+            "parse": time.perf_counter() - extracted
+        }
+    }
+
+
+class TranscriptStream:
+    """A running streaming job; iterate it for events, cancel() to stop the worker early"""
+
+    def __init__(self, future, events, cancel, timeout: float, on_timeout=None):
+        self._future = future
+        self._events = events
+        self._cancel = cancel
+        self._timeout = timeout
+        self._on_timeout = on_timeout
+
+    def cancel(self):
+        if not self._future.done():
+            self._cancel.set()
+
+    def _next_event(self):
+        try:
+            return self._events.get(timeout=STREAM_POLL_SECONDS)
+        except queue.Empty:
+            return None
+
+    async def events(self) -> AsyncIterator[dict]:
+        """
+        Yields {"event": "page", "page", "extracted_courses"} per page, then
+        {"event": "parsed", **parse_transcript result}.
+        Raises asyncio.TimeoutError (and cancels the job) past the pool timeout.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._timeout
+        result = asyncio.wrap_future(self._future)
+        try:
+            finished = False
+            while not finished:
+                # Every page event is queued before the job returns, so once it has
+                # returned one more pass over the queue sees all of them
+                finished = result.done()
+                while (event := await asyncio.to_thread(self._next_event)) is not None:
+                    _, page, codes = event
+                    yield {"event": "page", "page": page, "extracted_courses": codes}
+                if loop.time() > deadline:
+                    # The cancel flag is only checked between pages; a page that hangs needs the worker killed
+                    if self._on_timeout is not None:
+                        self._on_timeout(self._future)
+                    raise asyncio.TimeoutError()
+            yield {"event": "parsed", **result.result()}
+        finally:
+            self.cancel()
+
+
+class TranscriptParserPool:
+    def __init__(self, max_workers: int = 2, max_queue: int = 8, timeout: float = 30.0,
+                 max_pages: int = 20, retry_after: int = 5):
+        """
+        max_workers: worker processes
+        max_queue: jobs allowed to wait for a free worker before new ones are rejected
+        timeout: seconds to wait for one job
+        max_pages: pages extracted per PDF (0 = no limit)
+        retry_after: Retry-After seconds suggested when the pool is saturated
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self._executor = None
+        self._manager = None
+        self._manager_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily so importing main.py doesn't spawn processes
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=MP_CONTEXT,
+                                                 initializer=_warm_import)
+        return self._executor
+
+    def _release(self, _future):
+        self.in_flight -= 1
+
+    def _check_capacity(self):
+        if self.in_flight >= self.max_workers + self.max_queue:
+            raise TranscriptPoolBusy(self.retry_after)
+
+    def _submit(self, fn, *args):
+        """Submit a job within the in-flight bound; raises TranscriptPoolBusy when saturated"""
+        self._check_capacity()
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a hostile PDF); start a fresh pool
+            self._executor = None
+            future = self._get_executor().submit(fn, *args)
+
+        # The slot is freed when the worker is actually done, so jobs that
+        # outlive their timeout still count against the queue bound
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+        return future
+
+    def _recycle(self, future):
+        """
+        Terminate the pool's workers if future is still running (a timed-out job) and start
+        over with a fresh pool. Other jobs running at that moment fail with BrokenProcessPool;
+        every job's slot is released as its future completes.
+        """
+        if future.done() or self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+        logger.warning("🔪 PDF job exceeded %ss, terminating the parser workers", self.timeout)
+        # ProcessPoolExecutor has no public way to stop a running job; kill its processes directly
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def parse(self, contents: bytes) -> dict:
+        """
+        Parse a transcript in the pool.
+        Raises TranscriptPoolBusy when saturated and asyncio.TimeoutError when the job is too slow
+        (the stuck worker is terminated).
+        """
+        future = self._submit(parse_transcript, contents, self.max_pages)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self._recycle(future)
+            raise
+
+    def _stream_channels(self):
+        """
+        A job's event queue and cancel flag, hosted by the manager process (pool workers can't
+        share plain ones). Blocks on the manager (and on starting it the first time), so it
+        runs off the event loop.
+        """
+        with self._manager_lock:
+            if self._manager is None:
+                self._manager = MP_CONTEXT.Manager()
+            manager = self._manager
+        return manager.Queue(), manager.Event()
+
+    async def start_stream(self, contents: bytes) -> TranscriptStream:
+        """
+        Start a streaming parse (see TranscriptStream.events).
+        Raises TranscriptPoolBusy when saturated, before anything is streamed.
+        """
+        self._check_capacity()
+        events, cancel = await asyncio.to_thread(self._stream_channels)
+        future = self._submit(parse_transcript_streaming, contents, self.max_pages, events, cancel)
+        return TranscriptStream(future, events, cancel, self.timeout, on_timeout=self._recycle)
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        with self._manager_lock:
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
@@ -1,5 +1,147 @@
+import logging
 import re
-from typing import List, Tuple
+from itertools import chain, repeat
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marks the start of a course section (same anchor extract_courses_separate_lists uses)
+COURSE_SECTION_PATTERN = re.compile(r'Course')
+
+def iter_transcript_pages(pdf_stream: BinaryIO, max_pages: int = 0, stop_after_empty_pages: int = 2) -> Iterator[str]:
+    """
+    Yield the text of a transcript PDF one page at a time, in the same format as
+    pdfminer's extract_text (pages end with a form feed).
+    Reads from any binary stream (e.g. BytesIO) so no temp file is needed.
+    Stops after max_pages (0 = no limit), or once course sections have been found
+    and then stop_after_empty_pages pages in a row contain none (0 = never stop early).
+    """
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTContainer, LTText, LTTextBox
+
+    def render(item, parts):
+        if isinstance(item, LTContainer):
+            for child in item:
+                render(child, parts)
+        elif isinstance(item, LTText):
+            parts.append(item.get_text())
+        if isinstance(item, LTTextBox):
+            parts.append('\n')
+
+    seen_courses = False
+    pages_without_courses = 0
+
+    for page in extract_pages(pdf_stream, maxpages=max_pages):
+        parts = []
+        render(page, parts)
+        parts.append('\f')
+        page_text = ''.join(parts)
+        yield page_text
+
+        if COURSE_SECTION_PATTERN.search(page_text):
+            seen_courses = True
+            pages_without_courses = 0
+        elif seen_courses:
+            pages_without_courses += 1
+            if stop_after_empty_pages and pages_without_courses >= stop_after_empty_pages:
+                return
+
+def extract_transcript_text(pdf_stream: BinaryIO, max_pages: int = 0, stop_after_empty_pages: int = 2) -> str:
+    """Text of the transcript pages that can contain course sections (see iter_transcript_pages)"""
+    return ''.join(iter_transcript_pages(pdf_stream, max_pages, stop_after_empty_pages))
+
+class CourseRecord(NamedTuple):
+    subject: str
+    number: str
+    grade: Optional[str]
+    term: Optional[str]
+
+    @property
+    def code(self) -> str:
+        return self.subject + self.number
+
+# Keywords that drive parse_transcript_courses: a course section starts at "Course" and runs until
+# Description / Term GPA / Grade (like extract_courses_separate_lists); "Grade" also opens the grade
+# column, and a "Fall/Winter/Spring YYYY" heading starts a new term
+TRANSCRIPT_KEYWORD_PATTERN = re.compile(r'Course|Grade|Description|Term GPA|Fall|Winter|Spring')
+TERM_PATTERN = re.compile(r'(Fall|Winter|Spring)\s+(\d{4})')
+TERM_KEYWORDS = frozenset(("Fall", "Winter", "Spring"))
+# One line of a course section: a subject (6 letters for subjects like MATBUS), a number, or both
+COURSE_LINE_PATTERN = re.compile(
+    r'^[ \t]*(?:([A-Z]{2,6})|(\d+[A-Z]*)|([A-Z]{2,6})[ \t]+(\d+[A-Z]*))[ \t]*$', re.MULTILINE
+)
+# One line of a grade column, optionally preceded by attempted/earned credits
+GRADE_LINE_PATTERN = re.compile(
+    r'^[ \t]*(?:\d+\.\d+[ \t]+)*(\d{1,3}|[A-F][+-]?|CR|NCR|INC|DNW|AUD|WD|WF|IP)[ \t]*$', re.MULTILINE
+)
+
+def _warn_unpaired(term: Optional[str], subjects: List[str], numbers: List[str], grades: List[str]):
+    """A term whose columns don't line up: only the first min(...) subjects and numbers become courses"""
+    paired = min(len(subjects), len(numbers))
+    logger.warning(
+        "⚠️ %s: %d subjects, %d course numbers and %d grades; dropped unpaired subjects %s and numbers %s",
+        term or "Transcript", len(subjects), len(numbers), len(grades), subjects[paired:], numbers[paired:]
+    )
+
+def parse_transcript_courses(text: str) -> List[CourseRecord]:
+    """
+    Extract (subject, number, grade, term) records from transcript text in one linear scan.
+    Subjects and numbers are paired in order within each term, so a term with a missing
+    subject or number can't shift the courses of later terms; the unpaired lines of such a
+    term are logged as a warning. Grades are paired with the term's courses in order; grade
+    and term are None when the transcript doesn't show them.
+    """
+    records = []
+    term = None
+    subjects, numbers, grades = [], [], []
+    mode = None  # "Course" inside a course section, "Grade" inside a grade column
+    segment_start = 0
+
+    # Keywords are the only places the parser leaves C code; the text between them
+    # is handled by the multi-line patterns in a single findall call
+    for keyword in chain(TRANSCRIPT_KEYWORD_PATTERN.finditer(text), (None,)):
+        if keyword is None:
+            kind, position = None, len(text)
+        else:
+            kind, position = keyword.group(), keyword.start()
+            if kind == "Course" and mode == "Course":
+                continue  # "Course" inside a section is just content
+            if kind in TERM_KEYWORDS:
+                heading = TERM_PATTERN.match(text, position)
+                if heading is None:
+                    continue  # just a word in a description
+
+        if mode == "Course":
+            for subject, number, pair_subject, pair_number in COURSE_LINE_PATTERN.findall(text, segment_start, position):
+                if subject:
+                    subjects.append(subject)
+                elif number:
+                    numbers.append(number)
+                else:
+                    subjects.append(pair_subject)
+                    numbers.append(pair_number)
+        elif mode == "Grade":
+            grades += GRADE_LINE_PATTERN.findall(text, segment_start, position)
+
+        if kind is None or kind in TERM_KEYWORDS:
+            # Close the term: pair its subjects, numbers and grades in order
+            if subjects or numbers:
+                if len(subjects) != len(numbers) or len(grades) > len(subjects):
+                    _warn_unpaired(term, subjects, numbers, grades)
+                records += map(CourseRecord, subjects, numbers, chain(grades, repeat(None)), repeat(term))
+                subjects, numbers, grades = [], [], []
+            if kind is None:
+                break
+            term = f"{heading.group(1)} {heading.group(2)}"
+            if mode == "Grade":
+                mode = None
+            segment_start = heading.end()
+        else:
+            mode = kind if kind in ("Course", "Grade") else None
+            segment_start = keyword.end()
+
+    logger.debug("✅ Parsed %d courses from transcript", len(records))
+    return records
 
 def extract_courses_separate_lists(text: str) -> Tuple[List[str], List[str]]:
     """
@@ -7,7 +149,7 @@ def extract_courses_separate_lists(text: str) -> Tuple[List[str], List[str]]:
     Uses the proven method that looks for "Course" sections.
     Returns (course_codes, course_numbers) as separate lists.
     """
-    print(f"🔍 Looking for Course sections in transcript...")
+    logger.debug("🔍 Looking for Course sections in transcript...")
     
     course_codes = []
     course_numbers = []
@@ -15,10 +157,10 @@ def extract_courses_separate_lists(text: str) -> Tuple[List[str], List[str]]:
     # Find all "Course" sections - this is the key pattern from your working script
     course_sections = re.findall(r'Course\s*(.*?)(?=Description|Term GPA|Grade|$)', text, re.DOTALL)
     
-    print(f"📚 Found {len(course_sections)} Course sections")
+    logger.debug("📚 Found %d Course sections", len(course_sections))
 
     for i, section in enumerate(course_sections):
-        print(f"🔍 Processing section {i+1}: {section[:50]}...")
+        logger.debug("🔍 Processing section %d: %s...", i + 1, section[:50])
         
         lines = [line.strip() for line in section.split('\n') if line.strip()]
 
@@ -26,20 +168,19 @@ def extract_courses_separate_lists(text: str) -> Tuple[List[str], List[str]]:
             # Check if it's a department code (2-5 uppercase letters only)
             if re.match(r'^[A-Z]{2,5}$', line):
                 course_codes.append(line)
-                print(f"  📖 Found course code: {line}")
+                logger.debug("  📖 Found course code: %s", line)
             # Check if it's a course number (digits + optional letters only)
             elif re.match(r'^\d+[A-Z]*$', line):
                 course_numbers.append(line)
-                print(f"  🔢 Found course number: {line}")
+                logger.debug("  🔢 Found course number: %s", line)
 
-    print(f"✅ Total course codes found: {len(course_codes)}")
-    print(f"✅ Total course numbers found: {len(course_numbers)}")
+    logger.debug("✅ Total course codes found: %d, course numbers found: %d", len(course_codes), len(course_numbers))
     
     # Create full course list for verification
-    if course_codes and course_numbers:
+    if course_codes and course_numbers and logger.isEnabledFor(logging.DEBUG):
         min_length = min(len(course_codes), len(course_numbers))
         sample_courses = [course_codes[i] + course_numbers[i] for i in range(min(5, min_length))]
-        print(f"📚 Sample full courses: {sample_courses}")
+        logger.debug("📚 Sample full courses: %s", sample_courses)
 
     return course_codes, course_numbers
 
@@ -47,8 +188,7 @@ def extract_courses_full_codes(text: str) -> List[str]:
     """
     Extract complete course codes (e.g., CS240, MATH135) from transcript text.
     """
-    codes, numbers = extract_courses_separate_lists(text)
-    return [codes[i] + numbers[i] for i in range(len(codes))]
+    return [record.code for record in parse_transcript_courses(text)]
 
 def extract_grades(text: str) -> List[Tuple[str, str]]:
     """
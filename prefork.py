@@ -0,0 +1,109 @@
+"""
+Pre-fork serving: one listening socket, N uvicorn worker processes.
+
+The parent imports the app (which loads the course catalog) before forking, so
+every worker starts with the catalog already in memory and shares its pages
+copy-on-write. A binary store's matrix is memory-mapped, so it is shared through
+the page cache in any case. gc.freeze() keeps the collector from touching (and
+so copying) the objects allocated before the fork.
+
+The parent only supervises: it restarts workers that die, forwards SIGHUP
+(catalog reload) to every worker, and on SIGTERM/SIGINT stops them all.
+"""
+
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+# Workers that die sooner than this after starting are restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, backlog: int, keep_alive: int):
+    # The parent's handlers must not run in the worker; uvicorn installs its own
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, signal.SIG_DFL)
+    config = uvicorn.Config(app, backlog=backlog, timeout_keep_alive=keep_alive, log_config=None)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve_prefork(app, host: str = "0.0.0.0", port: int = 12000, workers: int = 2,
+                  backlog: int = 2048, keep_alive: int = 5):
+    """
+    Serve app from workers forked processes sharing one socket (Unix only).
+    Call after the app's module-level state (the catalog) has been loaded.
+    """
+    sock = bind_socket(host, port, backlog)
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(app, sock, backlog, keep_alive)
+            except BaseException:
+                logger.exception("❌ Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+        logger.info("👷 Started worker %d", pid)
+
+    def forward(signum, _frame):
+        nonlocal stopping
+        if signum != signal.SIGHUP:
+            stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, forward)
+
+    # Everything allocated so far (catalog included) is moved out of the collector's
+    # reach, so collections in the workers don't write to the shared pages
+    gc.collect()
+    gc.freeze()
+
+    logger.info("🚀 Serving on %s:%d with %d workers (backlog %d, keep-alive %ds)",
+                host, port, workers, backlog, keep_alive)
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+
+        logger.warning("⚠️ Worker %d exited (status %d), restarting", pid, status)
+        if time.monotonic() - started < MIN_WORKER_LIFETIME:
+            time.sleep(MIN_WORKER_LIFETIME)
+        if not stopping:
+            spawn()
+
+    sock.close()
+    logger.info("👋 All workers stopped")
@@ -1,204 +1,467 @@
 import json
-from typing import List, Dict
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Sequence
 import random
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from embedding_store import (
+    InMemoryReviews, load_embedding_store, load_store_index, load_store_neighbors, load_store_reviews
+)
+from reranker import DiversityReranker, department_of
+from ttl_cache import TTLCache
+from metrics import observe_stage, time_stage
+
+logger = logging.getLogger(__name__)
+
+# Students scored together in recommend_batch (bounds the similarity rows held at once)
+BATCH_CHUNK_SIZE = 256
+
+# Rating columns, in the order they are stored in the catalog's ratings matrix
+RATING_FIELDS = ('liked_percentage', 'easy_percentage', 'useful_percentage')
+
+@dataclass(slots=True)
+class CourseMeta:
+    """String fields of one catalog course (ratings are columnar, reviews out of line)"""
+    url: str
+    course_description: str
+
+@dataclass(slots=True)
+class CourseInfo:
+    course_code: str
+    url: str
+    useful_percentage: Optional[float]
+    easy_percentage: Optional[float]
+    liked_percentage: Optional[float]
+    course_description: str
+    review_source: object = field(repr=False, compare=False)
+    
+    def reviews(self, limit: Optional[int] = None) -> list:
+        """The course's reviews (at most limit), read from the catalog's review store"""
+        return self.review_source.get(self.course_code, limit)
+
+@dataclass(slots=True)
+class Recommendation:
+    course_code: str
+    score: float
+    course_info: CourseInfo
+    
+    def to_dict(self, max_reviews: Optional[int] = None) -> dict:
+        """Response shape used by the API; max_reviews caps the reviews included (None = all)"""
+        info = self.course_info
+        return {
+            "course_code": self.course_code,
+            "score": self.score,
+            "course_info": {
+                "url": info.url,
+                "useful_percentage": info.useful_percentage,
+                "easy_percentage": info.easy_percentage,
+                "liked_percentage": info.liked_percentage,
+                "course_description": info.course_description,
+                "reviews": info.reviews(max_reviews),
+                "total_reviews": info.review_source.count(self.course_code)
+            }
+        }
+
+def _rating_value(value: float):
+    """Ratings are stored as float64 with NaN for missing; give back what the catalog had"""
+    if value != value:
+        return None
+    return int(value) if value.is_integer() else value
 
 class CourseRecommender:
-    def __init__(self, embeddings_file: str = 'embedded_courses.json'):
-        print(f"📂 Loading pre-computed embeddings from {embeddings_file}")
+    def __init__(self, embeddings_file: str = 'embedded_courses.json',
+                 cache_size: int = 1024, cache_ttl: Optional[float] = 600.0,
+                 ann_exact_threshold: int = 50_000, ann_overfetch: int = 20,
+                 ann_department_leaders: int = 8, ann_quality_leaders: int = 4096,
+                 ann_params: Optional[dict] = None,
+                 neighbor_max_profile: int = 2, neighbor_leaders: int = 512, neighbor_max_fraction: float = 0.1,
+                 reranker: Optional[DiversityReranker] = None):
+        """
+        ann_exact_threshold: catalogs smaller than this use exact search even if the store has an ANN index
+        ann_overfetch: ANN candidates fetched per requested recommendation
+        ann_department_leaders: top quality courses per department added to the ANN candidates
+        ann_quality_leaders: top quality courses overall added to the ANN candidates
+        ann_params: search knobs passed to the index (nprobe for IVF, ef for HNSW)
+        neighbor_max_profile: profiles of at most this many courses are answered from the store's
+            precomputed neighbour lists instead of a full scan (0 = always scan)
+        neighbor_leaders: quality leaders added to the neighbour list candidates: the top neighbor_leaders
+            overall plus an even share per department (at most twice this many in total)
+        neighbor_max_fraction: the neighbour lists are only used while their candidates stay under this
+            fraction of the catalog (on small catalogs the full scan is cheaper)
+        reranker: picks the diverse top k from the scored candidates (default: DiversityReranker())
+        """
+        # Results are cached per instance, so loading a new artifact starts with an empty cache
+        self.result_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._fallback_results = {}
+        self.ann_index = None
+        self.neighbors = None
+        self.neighbor_max_profile = neighbor_max_profile
+        self.neighbor_leader_count = neighbor_leaders
+        self.neighbor_max_fraction = neighbor_max_fraction
+        self.reranker = reranker or DiversityReranker()
+        self.ann_overfetch = ann_overfetch
+        self.ann_department_leaders = ann_department_leaders
+        self.ann_quality_leaders = ann_quality_leaders
+        
+        logger.info("📂 Loading pre-computed embeddings from %s", embeddings_file)
+        if embeddings_file.endswith('.npy'):
+            self._load_store(embeddings_file)
+        else:
+            self._load_json(embeddings_file)
+        
+        if self.ann_index is not None:
+            if len(self.all_codes) < ann_exact_threshold:
+                self.ann_index = None
+            elif ann_params:
+                self.ann_index.set_params(**ann_params)
+        
+        self._build_ratings()
+        
+        if self.neighbors is not None:
+            candidates = self.neighbor_leaders.size + self.neighbor_max_profile * self.neighbors.shape[1]
+            if candidates > self.neighbor_max_fraction * len(self.all_codes):
+                logger.info("📏 Neighbour lists give up to %d candidates for %d courses, using the full scan",
+                            candidates, len(self.all_codes))
+                self.neighbors = None
+        
+        logger.info("✅ Loaded %d courses, %d with pre-computed embeddings, similarity search: %s",
+                    len(self.course_codes), len(self.all_codes),
+                    self.ann_index.kind if self.ann_index is not None else 'exact')
+    
+    def _set_courses(self, courses: Dict[str, dict]):
+        """
+        Keep only what recommendations need from the raw course dicts: a slotted record
+        with the strings per course and one float64 ratings row (NaN = missing).
+        """
+        self.course_codes = list(courses)
+        self.course_index = {code: i for i, code in enumerate(self.course_codes)}
+        self.course_meta = [
+            CourseMeta(url=data.get('url', ''), course_description=data.get('course_description', ''))
+            for data in courses.values()
+        ]
+        self.course_ratings = np.array(
+            [[np.nan if data.get(name) is None else data[name] for name in RATING_FIELDS] for data in courses.values()],
+            dtype=np.float64
+        ).reshape(len(self.course_codes), len(RATING_FIELDS))
+    
+    def _load_json(self, embeddings_file: str):
+        """Load the embedded_courses.json layout (embeddings as JSON float lists)"""
         with open(embeddings_file, 'r') as f:
-            self.course_data = json.load(f)
-        
-        print(f"✅ Loaded {len(self.course_data)} courses with pre-computed embeddings!")
-        
-        self.embeddings = {}
-        self.course_info = {}
-        
-        for course_code, data in self.course_data.items():
-            # Store course info
-            self.course_info[course_code] = {
-                'url': data.get('url', ''),
-                'useful_percentage': data.get('useful_percentage'),
-                'easy_percentage': data.get('easy_percentage'), 
-                'liked_percentage': data.get('liked_percentage'),
-                'course_description': data.get('course_description', ''),
-                'reviews': data.get('reviews', [])
-            }
-            
-            # Load pre-computed embeddings (lightning fast!)
-            if 'embedding' in data and data['embedding']:
-                self.embeddings[course_code] = np.array(data['embedding'])
-                print(f"⚡ Loaded {len(data['embedding'])}-dim embedding for {course_code}")
+            course_data = json.load(f)
+        
+        self._set_courses(course_data)
+        # The JSON layout has no out-of-line review file, so reviews stay in memory
+        self.reviews = InMemoryReviews({code: data.get('reviews') or [] for code, data in course_data.items()})
+        
+        # Load pre-computed embeddings straight into one float32 matrix; the parsed JSON
+        # (float lists included) is released when this returns
+        codes = [code for code, data in course_data.items() if data.get('embedding')]
+        if codes:
+            raw = np.array([course_data[code]['embedding'] for code in codes], dtype=np.float32)
+        else:
+            raw = np.zeros((0, 0), dtype=np.float32)
+        del course_data
+        
+        # Rows are L2-normalized so a dot product is a cosine similarity; the norms
+        # are kept so the profile can still be the mean of the raw embeddings
+        norms = np.linalg.norm(raw, axis=1)
+        safe_norms = np.where(norms > 0, norms, 1.0)
+        self._set_matrix(codes, np.ascontiguousarray(raw / safe_norms[:, None], dtype=np.float32), norms)
+    
+    def _load_store(self, matrix_file: str):
+        """Load a binary store written by generate_embeddings.py (matrix is memory-mapped, reviews read on demand)"""
+        matrix, meta = load_embedding_store(matrix_file)
+        
+        self._set_courses(meta["courses"])
+        self.reviews = load_store_reviews(matrix_file, meta)
+        self._set_matrix(meta["codes"], matrix, np.array(meta["norms"], dtype=np.float32))
+        self.neighbors = load_store_neighbors(matrix_file, meta)
+        
+        try:
+            self.ann_index = load_store_index(matrix_file, meta)
+        except ImportError as e:
+            logger.warning("⚠️ Can't load the store's ANN index (%s), using exact search", e)
+    
+    def _set_matrix(self, codes: List[str], matrix: np.ndarray, norms: np.ndarray):
+        self.all_codes = list(codes)
+        self.code_index = {code: i for i, code in enumerate(self.all_codes)}
+        self.embedding_matrix = matrix
+        self.embedding_norms = norms
     
     def get_embedding_info(self) -> dict:
         """Get information about loaded embeddings"""
-        if self.embeddings:
-            sample_embedding = next(iter(self.embeddings.values()))
+        if self.all_codes:
             return {
-                "total_courses": len(self.embeddings),
-                "embedding_dimension": len(sample_embedding),
-                "courses_with_embeddings": list(self.embeddings.keys())[:5]  # Show first 5
+                "total_courses": len(self.all_codes),
+                "embedding_dimension": int(self.embedding_matrix.shape[1]),
+                "similarity_search": self.ann_index.kind if self.ann_index is not None else "exact",
+                "neighbor_lists": int(self.neighbors.shape[1]) if self.neighbors is not None else 0,
+                "courses_with_embeddings": self.all_codes[:5]  # Show first 5
             }
         return {"total_courses": 0, "embedding_dimension": 0}
     
-    def recommend_courses_json(self, request_json: str) -> str:
-        try:
-            request = json.loads(request_json)
-            completed_courses = request.get("completed_courses", [])
-            
-            valid_completed = []
-            completed_embeddings = []
-            
-            # Find valid completed courses with embeddings
-            for course in completed_courses:
-                course_upper = course.upper()
-                if course_upper in self.embeddings:
-                    valid_completed.append(course_upper)
-                    completed_embeddings.append(self.embeddings[course_upper])
-            
-            # If no valid courses with embeddings, fall back to smart filtering
-            if not completed_embeddings:
-                print("⚠️ No embeddings found for completed courses, using fallback recommendations")
-                return self._fallback_recommendations(completed_courses)
-            
-            # Calculate user profile from completed courses
-            profile_embedding = np.mean(completed_embeddings, axis=0).reshape(1, -1)
-            
-            # Get all course codes and embeddings
-            all_codes = list(self.embeddings.keys())
-            all_embs = np.stack([self.embeddings[c] for c in all_codes])
-            
-            # Calculate similarities
-            similarities = cosine_similarity(profile_embedding, all_embs)[0]
-            
-            # Smart filtering and scoring
-            candidates = []
-            print(f"🔍 Analyzing {len(all_codes)} courses with pre-computed embeddings...")
-            print(f"🧠 User profile embedding shape: {profile_embedding.shape}")
-            print(f"📊 Course embeddings matrix shape: {all_embs.shape}")
-            
-            for i, course_code in enumerate(all_codes):
-                if course_code in valid_completed:
-                    continue  # Skip already completed courses
-                    
-                info = self.course_info[course_code]
-                liked_pct = info.get('liked_percentage') or 0
-                easy_pct = info.get('easy_percentage') or 50
-                useful_pct = info.get('useful_percentage') or 50
-                
-                # More relaxed filtering for better recommendations
-                if liked_pct < 50:  # At least 50% liked (was 70%)
-                    continue
-                    
-                # No difficulty filtering - let users choose their own challenge level
-                
-                # Combine similarity with course quality metrics (HEAVY easiness emphasis!)
-                similarity_score = similarities[i]
-                
-                # Quality score: 40% liked + 30% easiness + 30% usefulness (balanced)
-                quality_score = (0.4 * liked_pct + 0.3 * easy_pct + 0.3 * useful_pct) / 100
-                
-                # Weighted final score
-                final_score = 0.7 * similarity_score + 0.3 * quality_score
-                
-                candidates.append((course_code, final_score, info))
-            
-            print(f"✅ Found {len(candidates)} valid candidates after filtering")
-            
-            # Sort by score
-            candidates.sort(key=lambda x: x[1], reverse=True)
-            
-            # Add diversity: prefer different departments
-            diverse_recommendations = []
-            used_departments = set()
-            
-            print(f"🌈 Applying diversity filtering...")
-            
-            # First pass: get one course from each department
-            for course_code, score, info in candidates:
-                dept = course_code[:2] if len(course_code) >= 2 else course_code  # CS, MATH, etc.
-                if dept not in used_departments and len(diverse_recommendations) < 5:
-                    diverse_recommendations.append((course_code, score, info))
-                    used_departments.add(dept)
-                    print(f"  ✅ Added {course_code} (dept: {dept})")
-            
-            # Second pass: fill remaining slots if we don't have 5
-            for course_code, score, info in candidates:
-                if len(diverse_recommendations) >= 5:
-                    break
-                # Add if not already in recommendations
-                if not any(rec[0] == course_code for rec in diverse_recommendations):
-                    diverse_recommendations.append((course_code, score, info))
-                    print(f"  ➕ Added {course_code} (additional)")
+    def cache_stats(self) -> dict:
+        """Hit/miss counters of the recommendation result cache"""
+        return self.result_cache.stats()
+    
+    def _build_ratings(self):
+        """Pack ratings and departments into arrays aligned with the embedding matrix rows"""
+        self.row_course = np.array([self.course_index[code] for code in self.all_codes], dtype=np.int64)
+        self.liked_pct, self.easy_pct, self.useful_pct = (
+            column.astype(np.float32) for column in self._rating_columns(self.row_course)
+        )
+        
+        # Quality score: 40% liked + 30% easiness + 30% usefulness (balanced)
+        self.quality_scores = (0.4 * self.liked_pct + 0.3 * self.easy_pct + 0.3 * self.useful_pct) / 100
+        # More relaxed filtering for better recommendations: at least 50% liked
+        self.quality_mask = self.liked_pct >= 50
+        
+        departments = {}
+        self.dept_ids = np.array(
+            [departments.setdefault(department_of(code), len(departments)) for code in self.all_codes],
+            dtype=np.int32
+        )
+        self.department_names = list(departments.keys())
+        
+        # Highest quality eligible courses of each department and overall (extra ANN / neighbour list candidates)
+        eligible = np.flatnonzero(self.quality_mask)
+        by_dept = eligible[np.lexsort((eligible, -self.quality_scores[eligible], self.dept_ids[eligible]))]
+        dept_sorted = self.dept_ids[by_dept]
+        group_start = np.searchsorted(dept_sorted, dept_sorted, side='left')
+        rank_in_dept = np.arange(by_dept.size) - group_start
+        by_quality = eligible[np.lexsort((eligible, -self.quality_scores[eligible]))]
+        
+        # ANN candidates besides the nearest neighbours. Far from a profile similarity is close to noise,
+        # so a department's best blended score comes from one of its top quality courses; which of those
+        # departments make the results is decided across the whole catalog, hence the overall leaders
+        self.ann_leaders = np.union1d(by_dept[rank_in_dept < self.ann_department_leaders],
+                                             by_quality[:self.ann_quality_leaders])
+        
+        # Neighbour list candidates: the best quality courses overall plus an even share per department,
+        # so their number doesn't grow with the number of subjects
+        per_department = self.neighbor_leader_count // max(len(self.department_names), 1)
+        self.neighbor_leaders = np.union1d(by_quality[:self.neighbor_leader_count],
+                                           by_dept[rank_in_dept < per_department])
+    
+    def _rating_columns(self, courses: np.ndarray) -> tuple:
+        """
+        liked/easy/useful for catalog courses, with missing (and zero) ratings defaulted
+        the way the scores always have: liked to 0, easiness and usefulness to 50
+        """
+        ratings = self.course_ratings[courses]
+        liked, easy, useful = (ratings[:, i] for i in range(len(RATING_FIELDS)))
+        missing = np.isnan(ratings) | (ratings == 0)
+        return (np.where(missing[:, 0], 0.0, liked), np.where(missing[:, 1], 50.0, easy),
+                np.where(missing[:, 2], 50.0, useful))
+    
+    def course_info(self, course_code: str) -> Optional[CourseInfo]:
+        """Everything about one catalog course (reviews are read when asked for)"""
+        i = self.course_index.get(course_code)
+        if i is None:
+            return None
+        meta = self.course_meta[i]
+        liked, easy, useful = (_rating_value(value) for value in self.course_ratings[i].tolist())
+        return CourseInfo(
+            course_code=course_code,
+            url=meta.url,
+            useful_percentage=useful,
+            easy_percentage=easy,
+            liked_percentage=liked,
+            course_description=meta.course_description,
+            review_source=self.reviews
+        )
+    
+    def get_reviews(self, course_code: str, limit: Optional[int] = None, offset: int = 0) -> list:
+        return self.reviews.get(course_code, limit, offset)
+    
+    def _format_recommendation(self, course_code: str, score: float) -> Recommendation:
+        return Recommendation(course_code=course_code, score=float(score), course_info=self.course_info(course_code))
+    
+    def canonical_completed(self, completed_courses: Sequence[str]) -> tuple:
+        """Canonical form of a transcript: upper-cased, deduped, known codes only, sorted"""
+        return tuple(sorted({
+            course.upper() for course in completed_courses
+            if course.upper() in self.code_index
+        }))
+    
+    def _profiles(self, rows_per_student: List[List[int]]) -> np.ndarray:
+        """Unit-length user profiles: the mean of the raw embeddings of each student's completed courses"""
+        profiles = np.stack([
+            (self.embedding_matrix[rows] * self.embedding_norms[rows, None]).mean(axis=0)
+            for rows in rows_per_student
+        ])
+        norms = np.linalg.norm(profiles, axis=1, keepdims=True)
+        return np.divide(profiles, norms, out=np.zeros_like(profiles), where=norms > 0)
+    
+    def _rank_candidates(self, rows: Optional[np.ndarray], similarities: np.ndarray,
+                         completed_rows: List[int], k: int) -> List[Recommendation]:
+        """Score, filter and diversify one student's candidates (rows=None means the whole catalog)"""
+        started = time.perf_counter()
+        if rows is None:
+            # Weighted final score: similarity combined with course quality metrics
+            scores = 0.7 * similarities + 0.3 * self.quality_scores
             
-            top_5 = diverse_recommendations[:5]
+            # Skip low quality and already completed courses
+            eligible = self.quality_mask.copy()
+            eligible[completed_rows] = False
+            rows = np.flatnonzero(eligible)
+            scores = scores[rows]
+        else:
+            scores = 0.7 * similarities + 0.3 * self.quality_scores[rows]
+            keep = self.quality_mask[rows] & ~np.isin(rows, completed_rows)
+            rows, scores = rows[keep], scores[keep]
+        filtered = time.perf_counter()
+        observe_stage("filter", filtered - started)
+        
+        positions = self.reranker.rerank(rows, scores, self.dept_ids[rows], k, self.embedding_matrix)
+        observe_stage("diversity", time.perf_counter() - filtered)
+        return [self._format_recommendation(self.all_codes[rows[p]], scores[p]) for p in positions]
+    
+    def _ann_candidates(self, profiles: np.ndarray, top_n: int) -> list:
+        """
+        Nearest neighbours from the ANN index plus the quality leaders (per department and overall).
+        The diversity pass takes the best course of each department, which for departments
+        far from the profile is decided by quality rather than similarity, so those courses
+        would never show up among the nearest neighbours.
+        """
+        leaders = self.ann_leaders
+        leader_matrix = self.embedding_matrix[leaders]
+        # Per profile, like the exact scan, so a student's scores don't depend on the rest of the batch
+        leader_sims = [leader_matrix @ profile for profile in profiles]
+        
+        candidates = []
+        for (rows, sims), extra_sims in zip(self.ann_index.search(self.embedding_matrix, profiles, top_n), leader_sims):
+            rows, first = np.unique(np.concatenate((rows, leaders)), return_index=True)
+            candidates.append((rows, np.concatenate((sims, extra_sims))[first]))
+        return candidates
+    
+    def _neighbor_candidates(self, profile: np.ndarray, completed_rows: List[int]) -> tuple:
+        """
+        Candidates for a small profile from the precomputed neighbour lists: every course
+        in a completed course's top-M list, plus the quality leaders (they decide the picks from
+        departments far from the profile, where similarity is close to noise).
+        The profile is the norm-weighted mean of the completed embeddings, so its similarity
+        to a candidate is the weighted merge of the per-course similarities; one small
+        product over the candidates gives it exactly, including for courses missing from
+        some of the lists.
+        """
+        rows = np.unique(np.concatenate((self.neighbors['row'][completed_rows].ravel(), self.neighbor_leaders)))
+        return rows, self.embedding_matrix[rows] @ profile
+    
+    def recommend_batch(self, completed_lists: Sequence[Sequence[str]],
+                        k: Optional[int] = None) -> List[List[Recommendation]]:
+        """
+        Recommendations for many students at once. Entry i is what recommend
+        returns for completed_lists[i].
+        """
+        k = k or self.reranker.k
+        results = [None] * len(completed_lists)
+        
+        # Group students by canonical transcript; answer repeats from the result cache
+        pending = {}
+        for i, completed in enumerate(completed_lists):
+            key = self.canonical_completed(completed)
+            if not key:
+                continue
+            cached = self.result_cache.get((key, k))
+            if cached is not None:
+                results[i] = list(cached)
+            else:
+                pending.setdefault(key, []).append(i)
+        
+        keys = list(pending)
+        for start in range(0, len(keys), BATCH_CHUNK_SIZE):
+            chunk = keys[start:start + BATCH_CHUNK_SIZE]
+            rows_per_key = [[self.code_index[code] for code in key] for key in chunk]
+            with time_stage("profile"):
+                profiles = self._profiles(rows_per_key)
             
-            print(f"🎯 Returning {len(top_5)} diverse recommendations")
+            started = time.perf_counter()
+            candidates = [None] * len(chunk)
+            if self.neighbors is not None:
+                # One or two completed courses: merge their neighbour lists instead of scanning
+                for j, rows in enumerate(rows_per_key):
+                    if len(rows) <= self.neighbor_max_profile:
+                        candidates[j] = self._neighbor_candidates(profiles[j], rows)
             
-            # Show department spread
-            dept_spread = {}
-            for course_code, _, _ in top_5:
-                dept = course_code[:2] if len(course_code) >= 2 else course_code
-                dept_spread[dept] = dept_spread.get(dept, 0) + 1
-            print(f"📊 Department spread: {dept_spread}")
+            scan = [j for j, candidate in enumerate(candidates) if candidate is None]
+            if scan and self.ann_index is None:
+                # Cosine similarity of each profile against every course, one product per student:
+                # a multi-row product rounds differently, so batched scores would drift from recommend's
+                for j in scan:
+                    candidates[j] = (None, self.embedding_matrix @ profiles[j])
+            elif scan:
+                # Over-fetch so the quality filter, completed courses and diversity pass still have room.
+                # The fetch size depends only on the student's own transcript (searched in groups of
+                # equal size), so a batched student gets exactly what a single request would
+                by_top_n = {}
+                for j in scan:
+                    by_top_n.setdefault(k * self.ann_overfetch + len(rows_per_key[j]), []).append(j)
+                for top_n, group in by_top_n.items():
+                    for j, candidate in zip(group, self._ann_candidates(profiles[group], top_n)):
+                        candidates[j] = candidate
+            observe_stage("similarity", time.perf_counter() - started)
             
-            # Format recommendations
-            recommendations = []
-            for course_code, score, course_info in top_5:
-                recommendations.append({
-                    "course_code": course_code,
-                    "score": float(score),
-                    "course_info": {
-                        "url": course_info["url"],
-                        "useful_percentage": course_info["useful_percentage"],
-                        "easy_percentage": course_info["easy_percentage"],
-                        "liked_percentage": course_info["liked_percentage"],
-                        "course_description": course_info["course_description"],
-                        "reviews": course_info["reviews"]
-                    }
-                })
+            for j, key in enumerate(chunk):
+                candidate_rows, similarities = candidates[j]
+                recommendations = self._rank_candidates(candidate_rows, similarities, rows_per_key[j], k)
+                self.result_cache.put((key, k), recommendations)
+                for i in pending[key]:
+                    results[i] = list(recommendations)
+        
+        # If no valid courses with embeddings, fall back to smart filtering
+        missing = results.count(None)
+        if missing:
+            logger.debug("⚠️ No embeddings found for completed courses of %d student(s), using fallback recommendations", missing)
+            fallback = self._fallback_ranking(k)
+            results = [list(fallback) if result is None else result for result in results]
+        
+        return results
+    
+    def recommend(self, completed: Sequence[str], k: Optional[int] = None) -> List[Recommendation]:
+        """Top k diverse recommendations for one student's completed courses (k defaults to the reranker's)"""
+        recommendations = self.recommend_batch([completed], k)[0]
+        logger.debug("🎯 Returning %d diverse recommendations", len(recommendations))
+        return recommendations
+    
+    def recommend_courses_json(self, request_json: str) -> str:
+        """JSON-in/JSON-out wrapper around recommend, kept for compatibility"""
+        try:
+            request = json.loads(request_json)
+            completed_courses = request.get("completed_courses", [])
             
-            return json.dumps({"recommendations": recommendations})
+            recommendations = self.recommend(completed_courses, request.get("k"))
+            return json.dumps({"recommendations": [rec.to_dict() for rec in recommendations]})
             
         except Exception as e:
             return json.dumps({"recommendations": [], "error": str(e)})
     
+    def _fallback_ranking(self, k: int = 5) -> List[Recommendation]:
+        """Quality-based recommendations for when no embeddings are available"""
+        # Only depends on the catalog, so compute once per k and keep it
+        if k in self._fallback_results:
+            return self._fallback_results[k]
+        
+        # Filter by course quality only (over the whole catalog, embedded or not)
+        liked_pct, easy_pct, useful_pct = self._rating_columns(np.arange(len(self.course_codes)))
+        # Reasonable quality threshold
+        quality_courses = np.flatnonzero((liked_pct >= 50) & (easy_pct >= 60))
+        # Quality score: 40% liked + 30% easiness + 30% usefulness (balanced)
+        quality_scores = (0.4 * liked_pct + 0.3 * easy_pct + 0.3 * useful_pct)[quality_courses] / 100
+        
+        # Sort by quality and get top k (ties keep catalog order)
+        top = np.argsort(-quality_scores, kind='stable')[:k]
+        self._fallback_results[k] = [
+            self._format_recommendation(self.course_codes[i], score)
+            for i, score in zip(quality_courses[top], quality_scores[top])
+        ]
+        return self._fallback_results[k]
+    
     def _fallback_recommendations(self, completed_courses: list) -> str:
         """Fallback to quality-based recommendations when no embeddings available"""
         try:
-            # Filter by course quality only
-            quality_courses = []
-            for course_code, info in self.course_info.items():
-                liked_pct = info.get('liked_percentage') or 0
-                useful_pct = info.get('useful_percentage') or 50
-                easy_pct = info.get('easy_percentage') or 50
-                
-                if liked_pct >= 50 and easy_pct >= 60:  # Reasonable quality threshold
-                    # Quality score: 40% liked + 30% easiness + 30% usefulness (balanced)
-                    quality_score = (0.4 * liked_pct + 0.3 * easy_pct + 0.3 * useful_pct) / 100
-                    quality_courses.append((course_code, quality_score, info))
-            
-            # Sort by quality and get top 5
-            quality_courses.sort(key=lambda x: x[1], reverse=True)
-            top_5 = quality_courses[:5]
-            
-            recommendations = []
-            for course_code, score, course_info in top_5:
-                recommendations.append({
-                    "course_code": course_code,
-                    "score": float(score),
-                    "course_info": {
-                        "url": course_info["url"],
-                        "useful_percentage": course_info["useful_percentage"],
-                        "easy_percentage": course_info["easy_percentage"],
-                        "liked_percentage": course_info["liked_percentage"],
-                        "course_description": course_info["course_description"],
-                        "reviews": course_info["reviews"]
-                    }
-                })
-            
-            return json.dumps({"recommendations": recommendations})
+            return json.dumps({"recommendations": [rec.to_dict() for rec in self._fallback_ranking(self.reranker.k)]})
             
         except Exception as e:
-            return json.dumps({"recommendations": [], "error": str(e)})
\ No newline at end of file
+            return json.dumps({"recommendations": [], "error": str(e)})
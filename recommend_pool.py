@@ -0,0 +1,118 @@
+"""
+Recommendation calls off the event loop, with identical concurrent calls coalesced.
+
+CourseRecommender's work is NumPy (matrix products, partitions, sorts), which
+releases the GIL, so handlers run it on a small thread pool instead of blocking
+the loop for every other request. Calls carrying the same key (the catalog, the
+canonical completed-course set and k) while one is already running share that
+computation: the first caller submits it and the others await the same future.
+Bursts of identical requests (term start) cost one computation instead of one each.
+
+The number of distinct computations running or queued is bounded; past that,
+run raises RecommendationPoolBusy so the API can answer 429 instead of queueing
+without limit.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+
+from metrics import Counter
+
+COALESCED = Counter(
+    'watcourse_recommend_coalesced_total',
+    'Recommendation calls answered by an identical call already in flight'
+)
+
+
+class RecommendationPoolBusy(Exception):
+    """Raised when the pool already has its maximum number of computations in flight"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Recommender is busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RecommendationPool:
+    def __init__(self, max_workers: int = 4, max_in_flight: int = 64, retry_after: int = 1):
+        """
+        max_workers: threads running recommendations
+        max_in_flight: distinct computations allowed to run or wait before new ones are rejected
+        retry_after: Retry-After seconds suggested when the pool is saturated
+        """
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.running = 0
+        self.coalesced = 0
+        self._pending = {}
+        self._running_lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Computations submitted but still waiting for a thread"""
+        return max(0, self.in_flight - self.running)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="recommend")
+        return self._executor
+
+    def _call(self, fn: Callable, *args) -> Any:
+        with self._running_lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._running_lock:
+                self.running -= 1
+
+    def _release(self, key: Optional[Hashable], future: asyncio.Future):
+        self.in_flight -= 1
+        if key is not None and self._pending.get(key) is future:
+            del self._pending[key]
+        # Every waiter may have gone away (client disconnects); don't log an unretrieved exception
+        if not future.cancelled():
+            future.exception()
+
+    async def run(self, key: Optional[Hashable], fn: Callable, *args) -> Any:
+        """
+        fn(*args) on the pool. Callers passing the same key while it runs get the same
+        result object (treat it as read-only); key=None never coalesces.
+        Raises RecommendationPoolBusy when saturated.
+        """
+        if key is not None:
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                COALESCED.inc()
+                return await asyncio.shield(pending)
+
+        if self.in_flight >= self.max_in_flight:
+            raise RecommendationPoolBusy(self.retry_after)
+
+        future = asyncio.get_running_loop().run_in_executor(self._get_executor(), self._call, fn, *args)
+        self.in_flight += 1
+        if key is not None:
+            self._pending[key] = future
+        future.add_done_callback(lambda f: self._release(key, f))
+        # A cancelled caller (client gone) must not cancel the computation others are waiting on
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "coalesced": self.coalesced
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
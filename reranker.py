@@ -0,0 +1,153 @@
+"""
+Diversity reranking of scored recommendation candidates.
+
+The recommender scores every candidate (similarity blended with quality); the
+reranker picks the k results shown. It first narrows the candidates to a
+shortlist, the k * overfetch best overall plus the best course of each
+department (its best department_cap courses when a cap is set, so a capped
+selection can't run out of candidates), in a few vectorized passes, so the
+selection itself only ever works on that shortlist however large the catalog is.
+
+Modes:
+- 'department' (default): the best course of each department, highest scoring
+  departments first, then the next best overall matches
+- 'mmr': maximal marginal relevance, greedily trading a candidate's score against
+  its cosine similarity to the courses already picked (uses the embedding matrix)
+
+Both modes can cap how many results come from one department.
+"""
+
+import re
+from typing import List, Optional
+
+import numpy as np
+
+RERANK_MODES = ('department', 'mmr')
+
+_SUBJECT_PREFIX = re.compile(r'[A-Z]+')
+
+
+def department_of(course_code: str) -> str:
+    """Subject prefix of a course code (CS246 -> CS, MATBUS371 -> MATBUS)"""
+    match = _SUBJECT_PREFIX.match(course_code.upper())
+    return match.group() if match else course_code
+
+
+def top_positions(rows: np.ndarray, scores: np.ndarray, positions: np.ndarray, k: int) -> np.ndarray:
+    """The k best positions (into rows/scores) by score, highest first (ties keep catalog order)"""
+    if positions.size > k:
+        positions = positions[np.argpartition(-scores[positions], k - 1)[:k]]
+    return positions[np.lexsort((rows[positions], -scores[positions]))]
+
+
+def _rank_in_group(groups: np.ndarray) -> np.ndarray:
+    """For each element, how many earlier elements belong to the same group"""
+    order = np.argsort(groups, kind='stable')
+    sorted_groups = groups[order]
+    rank = np.empty(groups.size, dtype=np.int64)
+    rank[order] = np.arange(groups.size) - np.searchsorted(sorted_groups, sorted_groups, side='left')
+    return rank
+
+
+class DiversityReranker:
+    def __init__(self, k: int = 5, mode: str = 'department', department_cap: Optional[int] = None,
+                 overfetch: int = 10, mmr_lambda: float = 0.7):
+        """
+        k: results returned when a request doesn't ask for a number
+        mode: 'department' or 'mmr'
+        department_cap: most results from one department (None = no limit)
+        overfetch: shortlist size per result, on top of each department's best course
+        mmr_lambda: MMR weight of the score against redundancy (1 = plain top-k by score)
+        """
+        if mode not in RERANK_MODES:
+            raise ValueError(f"Unknown rerank mode {mode!r}, expected one of {RERANK_MODES}")
+        if department_cap is not None and department_cap < 1:
+            raise ValueError("department_cap must be at least 1")
+        self.k = k
+        self.mode = mode
+        self.department_cap = department_cap
+        self.overfetch = max(overfetch, 2)
+        self.mmr_lambda = mmr_lambda
+
+    def shortlist(self, rows: np.ndarray, scores: np.ndarray, depts: np.ndarray, k: int) -> np.ndarray:
+        """
+        Positions worth reranking: the k * overfetch best overall plus each department's best
+        (ties included), or with a cap each department's department_cap best, since every course
+        a capped selection takes from a department is among those
+        """
+        size = k * self.overfetch
+        if rows.size <= size:
+            return np.arange(rows.size)
+
+        top = np.argpartition(-scores, size - 1)[:size]
+        if self.department_cap is not None:
+            by_score = np.lexsort((rows, -scores))
+            return np.union1d(top, by_score[_rank_in_group(depts[by_score]) < self.department_cap])
+
+        dept_best = np.full(int(depts.max()) + 1, -np.inf, dtype=scores.dtype)
+        np.maximum.at(dept_best, depts, scores)
+        best = np.flatnonzero(scores == dept_best[depts])
+        return np.union1d(top, best)
+
+    def rerank(self, rows: np.ndarray, scores: np.ndarray, depts: np.ndarray, k: Optional[int] = None,
+               embeddings: Optional[np.ndarray] = None) -> List[int]:
+        """
+        Pick up to k candidates. rows are embedding matrix rows, scores their final scores
+        and depts their department ids; returns positions into those arrays, best first.
+        embeddings (the normalized matrix) is required in 'mmr' mode.
+        """
+        k = k or self.k
+        if rows.size == 0:
+            return []
+
+        keep = self.shortlist(rows, scores, depts, k)
+        rows, scores, depts = rows[keep], scores[keep], depts[keep]
+        if self.mode == 'mmr':
+            selected = self._mmr(rows, scores, depts, k, embeddings)
+        else:
+            selected = self._by_department(rows, scores, depts, k)
+        return [int(keep[p]) for p in selected]
+
+    def _by_department(self, rows: np.ndarray, scores: np.ndarray, depts: np.ndarray, k: int) -> np.ndarray:
+        order = top_positions(rows, scores, np.arange(rows.size), rows.size)
+
+        # First pass: the best course from each department, highest scoring departments first
+        _, first = np.unique(depts[order], return_index=True)
+        selected = order[np.sort(first)[:k]]
+        if selected.size >= k:
+            return selected
+
+        # Second pass: fill remaining slots with the next best overall matches
+        rest = order[~np.isin(order, selected)]
+        if self.department_cap is not None:
+            taken = np.bincount(depts[selected], minlength=int(depts.max()) + 1)
+            rest = rest[_rank_in_group(depts[rest]) + taken[depts[rest]] < self.department_cap]
+        return np.concatenate((selected, rest[:k - selected.size]))
+
+    def _mmr(self, rows: np.ndarray, scores: np.ndarray, depts: np.ndarray, k: int,
+             embeddings: Optional[np.ndarray]) -> List[int]:
+        if embeddings is None:
+            raise ValueError("MMR reranking needs the embedding matrix")
+
+        vectors = np.asarray(embeddings[rows], dtype=np.float32)
+        relevance = self.mmr_lambda * scores.astype(np.float32)
+        redundancy = np.zeros(rows.size, dtype=np.float32)
+        available = np.ones(rows.size, dtype=bool)
+        taken = np.zeros(int(depts.max()) + 1, dtype=np.int64)
+
+        selected = []
+        for _ in range(min(k, rows.size)):
+            # Positions are in catalog order, so argmax breaks ties like the department mode
+            value = np.where(available, relevance - (1 - self.mmr_lambda) * redundancy, -np.inf)
+            best = int(np.argmax(value))
+            if not available[best]:
+                break
+            selected.append(best)
+            available[best] = False
+            np.maximum(redundancy, vectors @ vectors[best], out=redundancy)
+
+            if self.department_cap is not None:
+                taken[depts[best]] += 1
+                if taken[depts[best]] >= self.department_cap:
+                    available[depts == depts[best]] = False
+        return selected
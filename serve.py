@@ -0,0 +1,34 @@
+"""
+Server entry point: python3 serve.py (start.sh runs it).
+
+main.py builds the app and loads the course catalog at import. The PDF pool
+starts its processes from a fork server, and every process started that way
+re-imports the __main__ module, so __main__ is kept to this small launcher;
+the app is only imported inside serve(), which child processes never call.
+Running main.py directly hands over to this script.
+"""
+
+import os
+
+
+def serve():
+    import uvicorn
+
+    # Loads the catalog once; pre-forked workers share it instead of loading their own
+    from main import app, logger
+    from prefork import serve_prefork
+
+    port = int(os.environ.get("PORT", 12000))
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    backlog = int(os.environ.get("BACKLOG", 2048))
+    keep_alive = int(os.environ.get("KEEP_ALIVE", 5))
+    logger.info("🚀 Starting FastAPI server on port %d", port)
+    logger.info("🔗 Visit /docs for API documentation")
+    if workers > 1:
+        serve_prefork(app, host="0.0.0.0", port=port, workers=workers, backlog=backlog, keep_alive=keep_alive)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port, backlog=backlog, timeout_keep_alive=keep_alive)
+
+
+if __name__ == "__main__":
+    serve()
@@ -1,2 +1,4 @@
 #!/bin/bash
-python3 main.py
+# WEB_CONCURRENCY > 1 pre-forks that many workers sharing one loaded catalog
+# (BACKLOG and KEEP_ALIVE tune the listening socket and idle connections)
+exec python3 serve.py
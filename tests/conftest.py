@@ -0,0 +1,65 @@
+"""
+Shared fixtures: a small synthetic catalog (the benchmarks' generator) written
+as a binary store with an IVF index and neighbour lists, and student transcripts
+drawn from one or two topics the way the recall benchmark draws them.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_course_data  # noqa: E402
+from embedding_store import write_embedding_store  # noqa: E402
+from reccomender import CourseRecommender  # noqa: E402
+
+CATALOG_COURSES = 4000
+CATALOG_SUBJECTS = 60
+
+
+def overlap(results: list, expected: list) -> float:
+    """Share of the expected recommendations (lists of lists) that are also in results"""
+    hits = sum(len({r.course_code for r in a} & {r.course_code for r in e}) for a, e in zip(results, expected))
+    return hits / sum(len(e) for e in expected)
+
+
+@pytest.fixture(scope="session")
+def catalog_data():
+    return synthetic_course_data(CATALOG_COURSES, json_ready=False, subjects=CATALOG_SUBJECTS)
+
+
+@pytest.fixture(scope="session")
+def catalog_store(catalog_data, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("catalog") / "catalog.npy")
+    write_embedding_store(catalog_data, path, ann_index="ivf", neighbors=50)
+    return path
+
+
+@pytest.fixture(scope="session")
+def exact_engine(catalog_store):
+    return CourseRecommender(catalog_store, cache_size=0, neighbor_max_profile=0)
+
+
+@pytest.fixture(scope="session")
+def transcripts(catalog_data):
+    rng = random.Random(0)
+    by_topic = {}
+    for code, course in catalog_data.items():
+        by_topic.setdefault(course["course_description"].rsplit(" ", 1)[-1], []).append(code)
+    topics = list(by_topic)
+    result = []
+    for _ in range(200):
+        pool = [code for topic in rng.sample(topics, rng.randint(1, 2)) for code in by_topic[topic]]
+        result.append(rng.sample(pool, min(len(pool), rng.randint(1, 8))))
+    return result
+
+
+@pytest.fixture(scope="session")
+def transcript_pdf():
+    """synthetic_transcript_pdf(terms, seed=...): one term per page (skips without reportlab)"""
+    pytest.importorskip("reportlab")
+    from benchmarks.synthetic import synthetic_transcript_pdf
+    return synthetic_transcript_pdf
@@ -0,0 +1,78 @@
+"""ANN search path (IVF index plus quality leaders) against the exact scan"""
+
+import random
+
+import pytest
+from conftest import CATALOG_COURSES, overlap
+
+from reccomender import CourseRecommender
+
+
+def ann_engine_for(store: str, **kwargs) -> CourseRecommender:
+    kwargs.setdefault("cache_size", 0)
+    # Leaders scaled down with the catalog (the defaults, 8 per department and 4096 overall, are sized
+    # for 100k courses; on this one 8 per department would hide a missing overall budget)
+    return CourseRecommender(store, ann_exact_threshold=0, neighbor_max_profile=0,
+                             ann_department_leaders=1, ann_quality_leaders=CATALOG_COURSES // 25, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def ann_engine(catalog_store):
+    return ann_engine_for(catalog_store)
+
+
+@pytest.fixture(scope="module")
+def mixed_students(catalog_data):
+    """One-course students batched with a long transcript"""
+    rng = random.Random(1)
+    codes = list(catalog_data)
+    return [rng.sample(codes, 1) for _ in range(100)] + [rng.sample(codes, 40)]
+
+
+def codes_of(results: list) -> list:
+    return [[r.course_code for r in recs] for recs in results]
+
+
+def picks_of(results: list) -> list:
+    return [[(r.course_code, r.score) for r in recs] for recs in results]
+
+
+def test_ann_index_is_used(ann_engine, exact_engine):
+    assert ann_engine.ann_index is not None
+    assert exact_engine.ann_index is None
+
+
+def test_recommendations_match_exact_search(ann_engine, exact_engine, transcripts):
+    approx = [ann_engine.recommend(t) for t in transcripts]
+    exact = [exact_engine.recommend(t) for t in transcripts]
+    # Same bar as benchmarks.bench_ann_recall --min-overlap
+    assert overlap(approx, exact) >= 0.97
+
+    exact_scores = {(i, r.course_code): r.score for i, recs in enumerate(exact) for r in recs}
+    for i, recs in enumerate(approx):
+        for r in recs:
+            if (i, r.course_code) in exact_scores:
+                assert r.score == pytest.approx(exact_scores[i, r.course_code], abs=1e-5)
+
+
+@pytest.mark.parametrize("k", [None, 3, 12])
+def test_batch_matches_single_requests(catalog_store, mixed_students, k):
+    # A small over-fetch makes the ANN fetch size visible in the results
+    engine = ann_engine_for(catalog_store, ann_overfetch=2)
+    batch = engine.recommend_batch(mixed_students, k)
+    # Scores too, not just the picks: a student's similarities must not depend on who shares the batch
+    assert picks_of(batch) == picks_of([engine.recommend(t, k) for t in mixed_students])
+
+
+def test_exact_batch_matches_single_requests(exact_engine, transcripts):
+    batch = exact_engine.recommend_batch(transcripts)
+    assert picks_of(batch) == picks_of([exact_engine.recommend(t) for t in transcripts])
+
+
+def test_cached_batch_results_match_single_requests(catalog_store, mixed_students):
+    cached = ann_engine_for(catalog_store, ann_overfetch=2, cache_size=1024)
+    uncached = ann_engine_for(catalog_store, ann_overfetch=2)
+    cached.recommend_batch(mixed_students)
+    assert cached.cache_stats()["size"] > 0
+    assert (codes_of([cached.recommend(t) for t in mixed_students])
+            == codes_of([uncached.recommend(t) for t in mixed_students]))
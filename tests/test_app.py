@@ -0,0 +1,203 @@
+"""
+End-to-end smoke test of the API on the synthetic catalog. TestClient runs the
+lifespan off the main thread, where the SIGHUP handler can't be installed, so
+startup must go on without it.
+"""
+
+import asyncio
+import importlib
+import json
+import os
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.synthetic import synthetic_course_data
+from embedding_store import write_embedding_store
+
+
+@pytest.fixture(scope="module")
+def main_module(catalog_store):
+    os.environ["EMBEDDINGS_FILE"] = catalog_store
+    try:
+        return importlib.import_module("main")
+    finally:
+        del os.environ["EMBEDDINGS_FILE"]
+
+
+@pytest.fixture(scope="module")
+def client(main_module):
+    with TestClient(main_module.app) as client:
+        yield client
+
+
+@pytest.fixture
+def saturated_recommender(main_module, monkeypatch):
+    monkeypatch.setattr(main_module.recommend_pool, "max_in_flight", 0)
+
+
+@pytest.fixture
+def admin(client, main_module, catalog_store, monkeypatch):
+    """Admin token headers; the shared catalog is reloaded afterwards for the other tests"""
+    monkeypatch.setattr(main_module, "ADMIN_TOKEN", "test-token")
+    headers = {"x-admin-token": "test-token"}
+    yield headers
+    response = client.post("/admin/reload", json={"embeddings_file": catalog_store}, headers=headers)
+    assert response.status_code == 200
+
+
+def test_health(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+
+
+def test_recommend(client, transcripts):
+    response = client.post("/recommend", json={"completed_courses": transcripts[0], "k": 3})
+    assert response.status_code == 200
+    codes = response.json()["recommendations"]
+    assert len(codes) == 3
+    assert not set(codes) & set(transcripts[0])
+
+
+def test_recommend_batch(client, transcripts):
+    response = client.post("/recommend/batch", json={"students": transcripts[:5]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_students"] == 5
+    assert all(result["total_recommendations"] == 5 for result in body["results"])
+
+
+def test_recommend_batch_size_is_limited(client, main_module, transcripts):
+    students = [transcripts[0]] * (main_module.BATCH_MAX_STUDENTS + 1)
+    assert client.post("/recommend/batch", json={"students": students}).status_code == 422
+
+
+def upload(client, pdf: bytes, stream: str = None):
+    url = f"/upload-pdf?stream={stream}" if stream else "/upload-pdf"
+    return client.post(url, files={"file": ("transcript.pdf", pdf, "application/pdf")})
+
+
+def test_upload_pdf(client, transcript_pdf):
+    pdf = transcript_pdf(terms=4)
+    # Parsed in the PDF worker pool, then answered from the upload cache
+    for cached in (False, True):
+        response = upload(client, pdf)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["cached"] is cached
+        assert body["total_courses_found"] == 20
+        assert body["total_recommendations"] == 5
+
+
+def test_stats_and_metrics(client):
+    assert client.get("/stats").status_code == 200
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert "watcourse_request_seconds" in metrics.text
+
+
+@pytest.mark.usefixtures("saturated_recommender")
+def test_upload_with_busy_recommender_is_429(client, transcript_pdf):
+    pdf = transcript_pdf(terms=3, seed=7)
+    response = upload(client, pdf)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+    # Streaming: the response has already started, so the stream ends with an error event
+    events = [json.loads(line) for line in upload(client, pdf, "ndjson").text.splitlines()]
+    assert events[-1]["event"] == "error"
+    assert events[-1]["retry_after"] == 1
+
+
+def test_streaming_upload(client, transcript_pdf):
+    pdf = transcript_pdf(terms=6, seed=11)
+    response = upload(client, pdf, "ndjson")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["event"] for event in events] == ["page"] * 6 + ["courses", "recommendations", "done"]
+    assert [event["page"] for event in events[:6]] == list(range(1, 7))
+    # Each page previews the courses read so far; the last one has them all
+    assert events[5]["extracted_courses"] == events[6]["extracted_courses"]
+
+    # Same body as the plain upload (answered from the upload cache, which keeps no grades or terms)
+    plain = upload(client, pdf).json()
+    assert plain["cached"] is True
+    ignored = ("event", "cached", "courses")
+    assert ({key: value for key, value in events[-1].items() if key not in ignored}
+            == {key: value for key, value in plain.items() if key not in ignored})
+
+    response = upload(client, transcript_pdf(terms=2, seed=12), "sse")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("event: page\ndata: ")
+
+
+def test_stream_disconnect_cancels_the_job(main_module, transcript_pdf, monkeypatch):
+    # Starlette closes the response body generator when the client goes away; do the same after one page
+    monkeypatch.setattr(main_module.pdf_pool, "max_pages", 0)
+    pdf = transcript_pdf(terms=60, seed=13)
+
+    async def disconnect_after_first_page():
+        job = await main_module.pdf_pool.start_stream(pdf)
+        body = main_module._format_events(
+            main_module._upload_events(None, pdf, "disconnect-test", None, job, 0), "ndjson"
+        )
+        first = json.loads(await body.__anext__())
+        await body.aclose()
+        return first, await asyncio.wait_for(asyncio.wrap_future(job._future), 30)
+
+    first, result = asyncio.run(disconnect_after_first_page())
+    assert first["event"] == "page"
+    # The worker saw the cancel flag between pages and gave up instead of reading all 60
+    assert result is None
+
+
+def test_reload_swaps_in_a_new_catalog(client, admin, tmp_path, transcripts):
+    before = client.get("/health").json()["catalog"]
+    store = str(tmp_path / "smaller.npy")
+    write_embedding_store(synthetic_course_data(500, json_ready=False, subjects=20), store)
+
+    response = client.post("/admin/reload", json={"embeddings_file": store}, headers=admin)
+    assert response.status_code == 200
+    after = client.get("/health").json()["catalog"]
+    assert after == response.json()["catalog"]
+    assert after["version"] != before["version"]
+    assert (after["file"], after["courses"], after["reloads"]) == (store, 500, before["reloads"] + 1)
+    assert after["last_error"] is None
+    assert client.post("/recommend", json={"completed_courses": transcripts[0]}).status_code == 200
+
+
+def test_failed_reload_keeps_the_old_catalog(client, admin, catalog_data, tmp_path, transcripts):
+    before = client.get("/health").json()["catalog"]
+    store = str(tmp_path / "corrupt.npy")
+    write_embedding_store(catalog_data, store)
+    # Flip the last embedding so the matrix no longer matches the sidecar's checksum
+    matrix = np.load(store, mmap_mode="r+")
+    matrix[-1] *= -1
+    matrix.flush()
+    del matrix
+
+    response = client.post("/admin/reload", json={"embeddings_file": store}, headers=admin)
+    assert response.status_code == 500
+    assert "checksum" in response.json()["error"]
+    after = client.get("/health").json()["catalog"]
+    assert {key: after[key] for key in ("file", "version", "reloads")} == {
+        key: before[key] for key in ("file", "version", "reloads")
+    }
+    assert "checksum" in after["last_error"]
+
+    response = client.post("/recommend", json={"completed_courses": transcripts[0], "k": 3})
+    assert response.status_code == 200
+    assert len(response.json()["recommendations"]) == 3
+
+
+@pytest.mark.parametrize("headers", [{}, {"x-admin-token": "wrong"}])
+def test_reload_needs_the_admin_token(client, main_module, monkeypatch, headers):
+    version = client.get("/health").json()["catalog"]["version"]
+    monkeypatch.setattr(main_module, "ADMIN_TOKEN", "test-token")
+    assert client.post("/admin/reload", headers=headers).status_code == 403
+    # With ADMIN_TOKEN unset the endpoint is disabled, whatever the header says
+    monkeypatch.setattr(main_module, "ADMIN_TOKEN", None)
+    assert client.post("/admin/reload", headers={"x-admin-token": "test-token"}).status_code == 403
+    assert client.get("/health").json()["catalog"]["version"] == version
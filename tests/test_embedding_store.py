@@ -0,0 +1,34 @@
+"""Binary embedding store files"""
+
+import os
+import stat
+
+from embedding_store import atomic_write
+
+
+def _write_text(text: str):
+    def write(path: str):
+        with open(path, "w") as f:
+            f.write(text)
+    return write
+
+
+def test_atomic_write_gives_new_files_the_umask_mode(tmp_path):
+    path = str(tmp_path / "catalog.meta.json")
+    umask = os.umask(0o022)
+    try:
+        atomic_write(path, _write_text("{}"))
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+
+def test_atomic_write_keeps_the_existing_mode(tmp_path):
+    path = str(tmp_path / "catalog.meta.json")
+    atomic_write(path, _write_text("{}"))
+    os.chmod(path, 0o640)
+    atomic_write(path, _write_text('{"version": 2}'))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    with open(path) as f:
+        assert f.read() == '{"version": 2}'
+    assert os.listdir(tmp_path) == ["catalog.meta.json"]
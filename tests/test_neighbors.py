@@ -0,0 +1,71 @@
+"""Precomputed neighbour-list path for one- and two-course profiles against the full scan"""
+
+import random
+
+import pytest
+from conftest import CATALOG_COURSES, overlap
+
+from benchmarks.synthetic import synthetic_course_data
+from embedding_store import write_embedding_store
+from reccomender import CourseRecommender
+
+# The same share of the catalog as the default 512 leaders on a 20k course catalog
+NEIGHBOR_LEADERS = CATALOG_COURSES // 40
+
+
+@pytest.fixture(scope="module")
+def neighbor_engine(catalog_store):
+    return CourseRecommender(catalog_store, cache_size=0, neighbor_leaders=NEIGHBOR_LEADERS)
+
+
+@pytest.fixture(scope="module")
+def small_profiles(catalog_data):
+    rng = random.Random(2)
+    codes = list(catalog_data)
+    return [rng.sample(codes, 1 + i % 2) for i in range(300)]
+
+
+def test_neighbor_lists_are_used(neighbor_engine):
+    assert neighbor_engine.neighbors is not None
+
+
+def test_small_catalog_falls_back_to_full_scan(catalog_store):
+    # 512 default leaders plus two lists of 50 are more than 10% of 4000 courses
+    assert CourseRecommender(catalog_store, cache_size=0).neighbors is None
+
+
+def test_recommendations_match_full_scan(neighbor_engine, exact_engine, small_profiles):
+    fast = [neighbor_engine.recommend(t) for t in small_profiles]
+    exact = [exact_engine.recommend(t) for t in small_profiles]
+    # Same bar as benchmarks.bench_neighbors --min-overlap
+    assert overlap(fast, exact) >= 0.9
+
+    # Similarities on the neighbour path are exact, so shared courses have the same score
+    for fast_recs, exact_recs in zip(fast, exact):
+        exact_scores = {r.course_code: r.score for r in exact_recs}
+        for r in fast_recs:
+            if r.course_code in exact_scores:
+                assert r.score == pytest.approx(exact_scores[r.course_code], abs=1e-5)
+
+
+def test_batch_matches_single_requests(neighbor_engine, small_profiles, transcripts):
+    # Neighbour-list and scanned students in one batch
+    students = small_profiles[:50] + transcripts[:50]
+    batch = neighbor_engine.recommend_batch(students)
+    single = [neighbor_engine.recommend(t) for t in students]
+    assert ([[(r.course_code, r.score) for r in recs] for recs in batch]
+            == [[(r.course_code, r.score) for r in recs] for recs in single])
+
+
+def test_candidates_do_not_grow_with_subject_count(tmp_path):
+    # More subjects than leaders: the per-department share must not add one leader per subject
+    data = synthetic_course_data(2000, json_ready=False, subjects=200)
+    store = str(tmp_path / "catalog.npy")
+    write_embedding_store(data, store, neighbors=50)
+    engine = CourseRecommender(store, cache_size=0, neighbor_leaders=NEIGHBOR_LEADERS, neighbor_max_fraction=1)
+    assert len(engine.department_names) > NEIGHBOR_LEADERS
+    assert engine.neighbor_leaders.size <= 2 * NEIGHBOR_LEADERS
+
+    row = engine.code_index[next(iter(data))]
+    rows, _ = engine._neighbor_candidates(engine.embedding_matrix[row], [row])
+    assert rows.size <= 2 * NEIGHBOR_LEADERS + 50
@@ -0,0 +1,49 @@
+"""PDF worker pool"""
+
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stands in for serve.py: imports the app only under the __main__ guard, then uses the PDF pool
+LAUNCHER = textwrap.dedent('''
+    import asyncio
+    import sys
+
+    PROBE = "sorted(m for m in ('main', 'reccomender') if m in __import__('sys').modules)"
+
+    async def use_pool(pdf_path):
+        import main
+        pool = main.pdf_pool
+        print("worker modules:", await asyncio.wrap_future(pool._submit(eval, PROBE)))
+        with open(pdf_path, "rb") as f:
+            stream = await pool.start_stream(f.read())
+        events = [event["event"] async for event in stream.events()]
+        print("stream:", events[-1])
+        pool.shutdown()
+
+    if __name__ == "__main__":
+        asyncio.run(use_pool(sys.argv[1]))
+''')
+
+
+def test_pool_processes_do_not_load_the_catalog(catalog_store, tmp_path):
+    synthetic = pytest.importorskip("benchmarks.synthetic")
+    pytest.importorskip("reportlab")
+    pdf_path = tmp_path / "transcript.pdf"
+    pdf_path.write_bytes(synthetic.synthetic_transcript_pdf(terms=2))
+    script = tmp_path / "launcher.py"
+    script.write_text(LAUNCHER)
+
+    env = dict(os.environ, EMBEDDINGS_FILE=catalog_store, PYTHONPATH=REPO_ROOT, LOG_LEVEL="INFO")
+    result = subprocess.run([sys.executable, str(script), str(pdf_path)], env=env, cwd=tmp_path,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    # Workers and the stream manager are started from the fork server; only the launcher's process loads
+    assert "worker modules: []" in result.stdout
+    assert "stream: parsed" in result.stdout
+    assert result.stdout.count("Loading pre-computed embeddings") == 1
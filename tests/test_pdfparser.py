@@ -0,0 +1,54 @@
+"""Transcript text parsing"""
+
+import logging
+
+from benchmarks.synthetic import synthetic_transcript_text
+from pdfparser import CourseRecord, extract_courses_separate_lists, parse_transcript_courses
+
+TERM = """Fall 2019  Level: 2A
+
+Course
+CS
+MATH
+STAT
+Description
+Data Structures
+Linear Algebra
+Probability
+
+Course
+{numbers}
+Attempted Earned Grade
+0.50 0.50 80
+0.50 0.50 70
+0.50 0.50 90
+Term GPA 80.00
+"""
+
+
+def test_records_carry_grade_and_term():
+    records = parse_transcript_courses(TERM.format(numbers="240\n136\n230"))
+    assert records == [
+        CourseRecord("CS", "240", "80", "Fall 2019"),
+        CourseRecord("MATH", "136", "70", "Fall 2019"),
+        CourseRecord("STAT", "230", "90", "Fall 2019")
+    ]
+
+
+def test_numbers_match_the_old_parser():
+    text = synthetic_transcript_text(terms=12, seed=3)
+    _, numbers = extract_courses_separate_lists(text)
+    assert [record.number for record in parse_transcript_courses(text)] == numbers
+
+
+def test_unpaired_subject_is_reported(caplog):
+    with caplog.at_level(logging.WARNING, logger="pdfparser"):
+        records = parse_transcript_courses(TERM.format(numbers="240\n136"))
+    assert [record.code for record in records] == ["CS240", "MATH136"]
+    assert "Fall 2019" in caplog.text and "'STAT'" in caplog.text
+
+
+def test_aligned_terms_do_not_warn(caplog):
+    with caplog.at_level(logging.WARNING, logger="pdfparser"):
+        parse_transcript_courses(synthetic_transcript_text(terms=12, seed=3))
+    assert not caplog.records
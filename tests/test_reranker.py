@@ -0,0 +1,89 @@
+"""Diversity reranking"""
+
+import numpy as np
+import pytest
+
+from reranker import DiversityReranker, department_of
+
+
+def candidates(counts, seed: int = 0):
+    """
+    Department d gets counts[d] candidates, every one of them scoring below all of department d-1's.
+    Returns rows, scores, depts and unit embeddings (one row per candidate).
+    """
+    rng = np.random.default_rng(seed)
+    depts = np.repeat(np.arange(len(counts)), counts)
+    scores = (len(counts) - depts + rng.uniform(0.0, 0.9, depts.size)).astype(np.float32)
+    embeddings = rng.normal(size=(depts.size, 8)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return np.arange(depts.size), scores, depts, embeddings
+
+
+def picked_depts(reranker, rows, scores, depts, embeddings, k=None):
+    return depts[reranker.rerank(rows, scores, depts, k, embeddings)].tolist()
+
+
+@pytest.mark.parametrize("code, department", [
+    ("CS246", "CS"), ("CO250", "CO"), ("MATH135", "MATH"), ("MATBUS371", "MATBUS"), ("cs136l", "CS")
+])
+def test_department_of(code, department):
+    assert department_of(code) == department
+
+
+def test_department_mode_takes_each_department_best_first():
+    rows, scores, depts, embeddings = candidates([10, 10, 10])
+    positions = DiversityReranker(k=5).rerank(rows, scores, depts)
+    # Best of departments 0, 1 and 2 in score order, then the next best overall (department 0)
+    assert depts[positions].tolist() == [0, 1, 2, 0, 0]
+    assert positions[:3] == [int(np.argmax(np.where(depts == d, scores, -np.inf))) for d in range(3)]
+
+
+@pytest.mark.parametrize("k", [1, 3, 8])
+def test_k(k):
+    rows, scores, depts, embeddings = candidates([10, 10, 10])
+    assert len(DiversityReranker(k=5).rerank(rows, scores, depts, k)) == k
+    assert len(DiversityReranker(k=k).rerank(rows, scores, depts)) == k
+
+
+@pytest.mark.parametrize("mode", ["department", "mmr"])
+def test_cap_finds_k_results_below_a_dominant_department(mode):
+    # 60 department 0 candidates fill the whole k * overfetch shortlist
+    rows, scores, depts, embeddings = candidates([60, 20, 20])
+    reranker = DiversityReranker(k=5, mode=mode, department_cap=2, overfetch=10)
+    picked = picked_depts(reranker, rows, scores, depts, embeddings)
+    assert len(picked) == 5
+    assert max(picked.count(d) for d in range(3)) == 2
+
+    unbounded = DiversityReranker(k=5, mode=mode, department_cap=2, overfetch=1000)
+    assert picked == picked_depts(unbounded, rows, scores, depts, embeddings)
+
+
+def test_cap_shortlist_is_bounded():
+    rows, scores, depts, embeddings = candidates([300] * 20)
+    reranker = DiversityReranker(k=5, department_cap=3, overfetch=10)
+    assert reranker.shortlist(rows, scores, depts, 5).size <= 5 * 10 + 20 * 3
+
+
+def test_mmr_with_lambda_one_is_top_k_by_score():
+    rows, scores, depts, embeddings = candidates([10, 10, 10])
+    positions = DiversityReranker(k=5, mode="mmr", mmr_lambda=1.0).rerank(rows, scores, depts, None, embeddings)
+    assert positions == np.argsort(-scores, kind="stable")[:5].tolist()
+
+
+def test_mmr_skips_near_duplicates():
+    rows = np.arange(3)
+    scores = np.array([1.0, 0.99, 0.9], dtype=np.float32)
+    depts = np.zeros(3, dtype=np.int64)
+    embeddings = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    # The second best is a copy of the best; the third is unrelated
+    assert DiversityReranker(k=2, mode="mmr", mmr_lambda=0.7).rerank(rows, scores, depts, None, embeddings) == [0, 2]
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        DiversityReranker(mode="random")
+    with pytest.raises(ValueError):
+        DiversityReranker(department_cap=0)
+    rows, scores, depts, _ = candidates([5, 5])
+    with pytest.raises(ValueError):
+        DiversityReranker(mode="mmr").rerank(rows, scores, depts)
@@ -0,0 +1,133 @@
+"""
+Dedup cache for transcript uploads, keyed on the SHA-256 of the PDF bytes.
+
+A repeat upload of the same file skips PDF extraction and goes straight to
+recommendation. Only derived course codes (subject + number) and the extracted
+text length are stored; never the transcript text, grades or terms.
+
+The default store is the in-process TTLCache. With a path, entries go to a small
+SQLite database instead, which survives restarts and is shared by pre-forked
+workers.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+from ttl_cache import TTLCache
+
+
+class CachedTranscript(NamedTuple):
+    courses: Tuple[Tuple[str, str], ...]  # (subject, number) in transcript order
+    raw_text_length: int
+
+
+def upload_key(contents: bytes, max_pages: int = 0) -> str:
+    """Content hash of an upload; the page limit is part of the key since it changes what is parsed"""
+    return f"{hashlib.sha256(contents).hexdigest()}:{max_pages}"
+
+
+class MemoryUploadCache:
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = 3600.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: str) -> Optional[CachedTranscript]:
+        return self._cache.get(key)
+
+    def put(self, key: str, entry: CachedTranscript):
+        self._cache.put(key, entry)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class SQLiteUploadCache:
+    def __init__(self, path: str, maxsize: int = 10000, ttl: Optional[float] = 3600.0):
+        """
+        path: SQLite database file (created if missing)
+        maxsize: rows kept; the least recently used are deleted past this
+        ttl: seconds an entry stays valid after it is stored (None = no expiry)
+        """
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # One connection per process: a connection must not be used across fork()
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                "key TEXT PRIMARY KEY, courses TEXT NOT NULL, raw_text_length INTEGER NOT NULL, "
+                "expires_at REAL, last_used REAL NOT NULL)"
+            )
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, key: str) -> Optional[CachedTranscript]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT courses, raw_text_length FROM uploads WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE uploads SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        courses: List[list] = json.loads(row[0])
+        return CachedTranscript(tuple(map(tuple, courses)), row[1])
+
+    def put(self, key: str, entry: CachedTranscript):
+        if self.maxsize <= 0:
+            return
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO uploads (key, courses, raw_text_length, expires_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(entry.courses), entry.raw_text_length, expires_at, now)
+            )
+            expired = self._db.execute("DELETE FROM uploads WHERE expires_at <= ?", (now,)).rowcount
+            overflow = self._db.execute(
+                "DELETE FROM uploads WHERE key IN ("
+                "SELECT key FROM uploads ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,)
+            ).rowcount
+            self.evictions += expired + overflow
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def create_upload_cache(path: Optional[str] = None, maxsize: int = 256, ttl: Optional[float] = 3600.0):
+    """SQLite-backed cache when path is given, in-memory otherwise"""
+    if path:
+        return SQLiteUploadCache(path, maxsize, ttl)
+    return MemoryUploadCache(maxsize, ttl)